@@ -27,7 +27,9 @@ TODO:
 # import libraries
 import os
 import csv
+import zipfile
 import re, requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
 from bs4 import BeautifulSoup
@@ -35,29 +37,51 @@ from openpyxl import Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Alignment, Font
+from SECclient import getClient
+from SECcache import SingleFlight, getNoStatementsRecord
+from SECtickers import findCIK
+from SECfacts import getCompanyFacts
+from SECinline import inlineCompanyFacts
+from SECstatements import STATEMENT_NAMES, StatementLayoutError, build_statements
+from SECparse import FilingList, parse_cik, make_filing_list_soup, parse_filing_entries, parse_company_info, filing_index_url, \
+     find_filing_summary, parse_reports, has_statements, grab_financial_statements, parse_statement, has_next_page, \
+     is_amendment, pick_candidates, candidate_stages, financial_report_url, parse_financial_report, submission_url, \
+     is_statement_document, iter_submission_documents, find_primary_document
+
+# every request for a filing list page in this run goes through here (see requestFilingListPage)
+filingListFlight = SingleFlight(ttl = 300)
+
+# and every parsed FilingList (see getFilingList)
+filingListsFlight = SingleFlight(ttl = 300)
+
+# how many of a company's most recent filings to check for financial statements before giving up
+MAX_TRIES = 6
 
 """
 Use input ticker to find the CIK number, then the Accession number for the most
 recent 10k report, as well as the company's info
 """
-def getCIK(ticker):
-    '''This function uses requests to go to the URL address, and then uses the input ticker to find the
-    CIK of that company. It creates a list of CIK's in the variable 'results' but the elements are all the
-    same.'''
+def getCIK(ticker, client = None):
+    '''This function looks the ticker up in the local ticker index (see SECtickers.py), which is built from
+    SEC's company_tickers.json and doesn't need the network once it has been saved. If the ticker isn't in
+    the index, it falls back to using requests to go to the URL address, and then uses the input ticker to find
+    the CIK of that company. It creates a list of CIK's in the variable 'results' but the elements are all the
+    same.
+
+    Like every function below that goes to SEC Edgar, it takes an optional client (see SECclient.py) so
+    that all the requests in a run share the same pooled connections. If no client is given, the shared
+    one is used.'''
+    CIK = findCIK(ticker)
+    if CIK is not None:
+        return CIK
+
+    client = client or getClient()
     URL = 'https://www.sec.gov/cgi-bin/browse-edgar?CIK={}&Find=Search&owner=exclude&action=getcompany'
-    CIK_RE = re.compile(r'.*CIK=(\d{10}).*')
-    cik_dict = {}
-    f = requests.get(URL.format(ticker), stream = True)
-    results = CIK_RE.findall(f.text)
-    
-    if len(results):
-        results[0] = int(re.sub('\.[0]*', '.', results[0]))
-        cik_dict[str(ticker).upper()] = str(results[0])
-        
-    CIK = cik_dict[ticker]
+    f = client.get(URL.format(ticker), stream = True)
+    CIK = parse_cik(f.text, ticker)
     return CIK
 
-def requestFilingListPage(CIK, t):
+def requestFilingListPage(CIK, t, client = None, start = 0):
     '''This function is an intermediary between finding the company CIK and pulling the 10-K document.
     It is called in the first line of get10kFilingInfo, not in the main function.
     
@@ -66,7 +90,23 @@ def requestFilingListPage(CIK, t):
     Later on, we can start pulling 10-Q documents, etc.
     
     The function uses requests to go find the page on SEC Edgar. It then uses BeautifulSoup to turn this
-    content into something the program can read through and parse.'''
+    content into something the program can read through and parse.
+
+    One run asks for the same page several times (getFilingInfo, getCompanyInfo, and the amendment retries),
+    so the request goes through filingListFlight: if the same CIK and document type is already being
+    downloaded, or was in the last few minutes, the same soup is handed back instead of downloading it again.
+
+    The page only holds 100 filings. start is the number of filings to skip, which is how the later pages
+    are requested (see iterFilingEntries).'''
+    client = client or getClient()
+
+    # the same company can show up as '21344' or '0000021344', and the type as '10-k' or '10-K'
+    key = (str(CIK).lstrip('0'), str(t).upper(), int(start))
+    return filingListFlight.do(key, lambda: fetchFilingListPage(CIK, t, client, start))
+
+def fetchFilingListPage(CIK, t, client, start = 0):
+    '''Downloads and parses the filing list page. This is what requestFilingListPage() runs when it doesn't
+    already have the page.'''
     # define the endpoint to do filing searches.
     browse_edgar = r"https://www.sec.gov/cgi-bin/browse-edgar"
 
@@ -79,15 +119,58 @@ def requestFilingListPage(CIK, t):
         'type':t,
         'output':'atom',
     }
+    if start:
+        search_params['start'] = str(start)
 
     # make the request
-    response = requests.get(url=browse_edgar, params=search_params)
-    soup = BeautifulSoup(response.content,'xml')
+    response = client.get(url=browse_edgar, params=search_params)
+    soup = make_filing_list_soup(response.content)
     #print("Response URL:\n"+response.url)
     
     return soup
 
-def getFilingInfo(CIK, counter, t):
+def iterFilingEntries(CIK, t, client = None):
+    '''Yields every filing of type t the company has published, newest first, as (accession number, info)
+    pairs where info holds the filing_date, filing_href and filing_type. It reads the list one page of 100
+    at a time and only asks for the next page when the caller wants more than the current one holds and the
+    page has a rel="next" link. So looking up the latest 10-K reads one page, and a full backfill goes
+    through every page without ever holding more than one of them.
+
+    Only the first page goes through requestFilingListPage() and its filingListFlight, because the rest of a
+    run asks for that one again. The later pages are only read here, once, so they are downloaded straight
+    with fetchFilingListPage(): kept in the single-flight, every page of a backfill would stay in memory for
+    its ttl.
+
+    For example, the five most recent filings are:
+        itertools.islice(iterFilingEntries(CIK, '10-K'), 5)'''
+    client = client or getClient()
+    start = 0
+    while True:
+        if start == 0:
+            soup = requestFilingListPage(CIK, t, client)
+        else:
+            soup = fetchFilingListPage(CIK, t, client, start)
+        ACClist, masterListXML = parse_filing_entries(soup)
+        for ACC, entry_dict in zip(ACClist, masterListXML):
+            yield ACC, entry_dict[ACC]
+
+        # stop if this was the last page
+        if len(ACClist) == 0 or not has_next_page(soup):
+            return
+        start += len(ACClist)
+
+def getFilingList(CIK, t, client = None, allPages = False):
+    '''Returns the company's filings of type t as a FilingList (see SECparse.py). The list is parsed once
+    per CIK and type and then handed out again by filingListsFlight, so stepping the counter in getFilingInfo
+    (like the amendment retries do) doesn't download or parse anything new. By default only the first page
+    (the 100 most recent filings) is read; allPages reads the whole history.'''
+    # the same company can show up as '21344' or '0000021344', and the type as '10-k' or '10-K'
+    key = (str(CIK).lstrip('0'), str(t).upper(), bool(allPages))
+    if allPages:
+        return filingListsFlight.do(key, lambda: FilingList.fromEntries(iterFilingEntries(CIK, t, client)))
+    return filingListsFlight.do(key, lambda: FilingList.fromSoup(requestFilingListPage(CIK, t, client)))
+
+def getFilingInfo(CIK, counter, t, client = None):
     '''This function uses the requestFilingListPage() function to find a list of filings published by the
     company. By default, it finds 10-k filings. However, this can be changed from the main function to find
     other types of documents, such as 10-Q reports, etc.
@@ -98,118 +181,135 @@ def getFilingInfo(CIK, counter, t):
     finds the most recent report by default, but it can be changed in the main function.
 
     To get report data on previous reports as well as the most recent, we can loop through this function so that
-    i increases by 1 each time.'''
-    soup = requestFilingListPage(CIK, t)
-    
-    # find all the accession number entry tags
-    entries = soup.find_all('entry')
-
-    # initialize lists for storage
-    masterListXML = []
-    ACClist = []
-
-    # loop through each entry
-    for entry in entries:
-
-        # grab the accession number to create a key value
-        accession_num = entry.find('accession-number').text #don't know why, but SEC misspelled "number" here
-        ACClist.append(accession_num)
-
-        #Don't really need this dictionary, but it will likely be useful at some point.
-        entry_dict = {}
-        entry_dict[accession_num] = {}
-
-        # store the file info
-        entry_dict[accession_num]['filing_date'] = entry.find('filing-date').text
-        entry_dict[accession_num]['filing_href'] = entry.find('filing-href').text
-        entry_dict[accession_num]['filing_type'] = entry.find('filing-type').text
-
-        # store in the master list
-        masterListXML.append(entry_dict)
+    i increases by 1 each time. The list itself comes from getFilingList(), so it is only parsed once.'''
+    filing = getFilingList(CIK, t, client)[counter]
 
     # return accession number of the most recent 10-k filing
-    ACC = ACClist[counter]
-    filingDate = masterListXML[counter][ACC]['filing_date']
+    ACC = filing.accession
+    filingDate = filing.date
     
     #print("master_list_xml:\n\n"+str(master_list_xml))
     return ACC, filingDate
 
-def getCompanyInfo(CIK, ticker):
+def getCompanyInfo(CIK, ticker, client = None):
     '''This function is not crucial to making the program work. However, it gives us helpful company info
     like business and mailing addresses, its Standard Industrial Classification (SIC) information, the
     company's official name, its CIK, and its fyscal year end. Yes, we already have the CIK, but its helpful
     to have all this info in one place. We can add more info as needed.'''
-    soup = requestFilingListPage(CIK, t = '10-k')
-    
-    # find all the accession number entry tags
-    info = soup.find('company-info')
-
-    # loop through each entry
-    for item in info:
-
-        info_dict = {}
-
-        # store the addresses info (mailing and business)
-        info_dict['addresses'] = {}
-
-        info_dict['addresses']['mailing'] = {}
-        info_dict['addresses']['mailing']['city'] = info.find('city').text
-        info_dict['addresses']['mailing']['state'] = info.find('state').text
-        info_dict['addresses']['mailing']['street1'] = info.find('street1').text
-        if info.find('street2') is not None:
-            info_dict['addresses']['mailing']['street2'] = info.find('street2').text
-        info_dict['addresses']['mailing']['zip'] = info.find('zip').text
-
-        info_dict['addresses']['business'] = {}
-        info_dict['addresses']['business']['city'] = info.find('city').text
-        info_dict['addresses']['business']['phone'] = info.find('phone').text
-        info_dict['addresses']['business']['state'] = info.find('state').text
-        info_dict['addresses']['business']['street1'] = info.find('street1').text
-        if info.find('street2') is not None:
-            info_dict['addresses']['business']['street2'] = info.find('street2').text
-        info_dict['addresses']['business']['zip'] = info.find('zip').text
-
-        # store the company's Standard Industrial Classification (SIC) info
-        info_dict['sicInfo'] = {}
-        info_dict['sicInfo']['SIC'] = info.find('assigned-sic').text
-        info_dict['sicInfo']['SIC Description'] = info.find('assigned-sic-desc').text
-        info_dict['sicInfo']['SIC URL'] = info.find('assigned-sic-href').text
-
-        # store name info
-        info_dict['nameInfo'] = {}
-        info_dict['nameInfo']['Name'] = info.find('conformed-name').text
-        '''can add code to also append former names to the dictionary if needed'''
-        
-        # store other company info
-        info_dict['CIK'] = info.find('cik').text
-        info_dict['ticker'] = ticker
-        info_dict['FYE'] = info.find('fiscal-year-end').text
+    soup = requestFilingListPage(CIK, t = '10-k', client = client)
+    info_dict = parse_company_info(soup, ticker)
 
     # return accession number of the most recent 10-k filing
     #print("\n\ninfo_dict:\n\n"+str(info_dict))
     companyName = info_dict['nameInfo']['Name']
     return info_dict, companyName
 
+"""
+Pick the most recent filing that has financial statements:
+"""
+def check_candidate(CIK, filing, client, parser = None):
+    '''Checks one candidate filing: downloads its index.json, and if it has a FilingSummary.xml, downloads
+    and parses that too. Returns (xml_summary, master_reports) if the summary has a 'Statements' category,
+    and None if it doesn't (amendments and some other filings don't). parser is the parser backend the
+    FilingSummary.xml is read with (see SECparse.py). Raises if either download fails (a 404, a 429 or an
+    error page), since that doesn't say anything about whether the filing has statements.'''
+    response = client.get(filing_index_url(CIK, filing.accession))
+    response.raise_for_status()
+    xml_summary = find_filing_summary(response.json())
+    if xml_summary is None:
+        return None
+
+    response = client.get(xml_summary)
+    response.raise_for_status()
+    master_reports = parse_reports(response.content, xml_summary, parser, stopEarly = True)
+    if not has_statements(master_reports):
+        return None
+    return xml_summary, master_reports
+
+def select_statements_filing(CIK, t, client = None, counter = 0, candidates = MAX_TRIES, skipAmendments = True,
+                             record = None, parser = None):
+    '''This replaces the old way of handling amendments, where get_filing_summary() and parse_filing_summary()
+    called themselves again with counter + 1 every time a filing didn't have statements, one full round of
+    downloads after another. Instead, the next few filings in the list (starting at counter) are checked with
+    check_candidate() in stages (see candidate_stages() in SECparse.py): the newest one first, since it nearly
+    always has statements, and only if it doesn't, the next ones a few at a time. The newest one that has
+    statements is returned. So a company that has published a string of 10-K/A's costs a couple of rounds of
+    requests instead of one per amendment, and one that hasn't costs just the two requests of its newest filing.
+
+    Before anything is downloaded, the candidates are filtered using what the atom feed already says about
+    them and what has been learned before (see NoStatementsRecord in SECcache.py):
+        - amendments (10-K/A) are skipped by their form type, unless skipAmendments is False
+        - filings that have already been found without statements are skipped
+        - if this company's amendments have been found without statements before, they are skipped too
+    Every candidate that turns out not to have statements is added to the record. A candidate that couldn't be
+    checked (the download or the parsing failed) is unknown: it isn't added to the record, and the next
+    candidate is tried.
+
+    Returns master_reports, counter, ACC, filingDate, xml_summary (counter is the position of the filing that
+    was picked in the filing list), or None if none of the candidates have statements.'''
+    client = client or getClient()
+    if record is None:
+        record = getNoStatementsRecord()
+
+    def skip(filing):
+        amendment = is_amendment(filing.type)
+        return (skipAmendments and amendment) or record.isUseless(CIK, filing, amendment)
+
+    picked = pick_candidates(getFilingList(CIK, t, client), counter, candidates, skip)
+
+    # the pool isn't used as a context manager, because leaving that waits for every candidate that is still being
+    # checked, even once a newer one has been picked
+    pool = ThreadPoolExecutor(max_workers = max(1, len(picked)))
+    try:
+        # go through the results newest first, so the first good one is the most recent filing with statements
+        for stage in candidate_stages(picked):
+            futures = [pool.submit(check_candidate, CIK, filing, client, parser) for n, filing in stage]
+            for (n, filing), future in zip(stage, futures):
+                try:
+                    found = future.result()
+                except Exception as e:
+                    print("Couldn't check the filing from " + filing.date + " (" + str(e) + "). Trying the next one.")
+                    continue
+                if found is None:
+                    record.record(CIK, filing, is_amendment(filing.type))
+                    continue
+
+                xml_summary, master_reports = found
+                print('-' * 100)
+                print('File Name: FilingSummary.xml')
+                print('File Date: ' + filing.date)
+                print('File Path: ' + xml_summary)
+                if n > counter:
+                    print("NOTICE: the " + str(n - counter) + " more recent filing(s) were amendments or didn't have financial statements, " +
+                          "so the filing from " + filing.date + " is being used.")
+                return master_reports, n, filing.accession, filing.date, xml_summary
+    finally:
+        pool.shutdown(wait = False, cancel_futures = True)
+
+    print("None of the entity's " + str(candidates) + " most recent " + t + " reports have financial statements.")
+    return None
+
 """
 Grab the Filing XML Summary:
 """
-def get_filing_summary(companyInfoDict, ACC, counter, filingDate, t):
+def get_filing_summary(companyInfoDict, ACC, counter, filingDate, t, client = None):
     '''Now that we have the accession number of the filing that we want, we can get the filing summary.
     This function builds a URL with the CIK number and the accession number. The resulting page is the
     summary of the financial report. To fully understand the way this function works, it's best to look
     at the 'File Path' URL that this function creates and prints out (the variable is xml_summary).
     The function outputs this xml_summary of the report so that the next functions can parse the summary,
-    find and grab the financial statements, and then scrape them into an organized dictionary.'''
-    # define the base url needed to create the file url and set xml_summary to None.
-    base_url = r"https://www.sec.gov/"
-    xml_summary = None
+    find and grab the financial statements, and then scrape them into an organized dictionary.
+
+    Returns xml_summary, counter, ACC, filingDate. If the filing doesn't have a summary, another filing is picked
+    (see below), so the ACC and filingDate that come back are the ones of the filing the summary belongs to.
+    xml_summary is None if no filing with statements was found.'''
+    client = client or getClient()
 
     # convert a normal url to a 10k document landing page url
-    normal_url = base_url + "Archives/edgar/data/" + companyInfoDict['CIK'] + "/" + ACC + ".txt"
-    DocLandPage_url = normal_url.replace('-','').replace('.txt','/index.json')
+    DocLandPage_url = filing_index_url(companyInfoDict['CIK'], ACC)
 
     # request the url and decode it.
-    content = requests.get(DocLandPage_url).json()
+    content = client.get(DocLandPage_url).json()
     #print(content)
 
     if counter > 0:
@@ -218,34 +318,27 @@ def get_filing_summary(companyInfoDict, ACC, counter, filingDate, t):
         print("There was an issue with the contents of the 10-K report. Pulling the info for the next most recent report.")
         print('-'*100 + '\n')
         
-    for file in content['directory']['item']:
-        
-        # Grab the filing summary and create a new url leading to the file so we can download it.
-        if file['name'] == 'FilingSummary.xml':
-
-            xml_summary = base_url + content['directory']['name'] + "/" + file['name']
-            
-            print('-' * 100)
-            print('File Name: ' + file['name'])
-            print('File Date: ' + filingDate)
-            print('File Path: ' + xml_summary)
+    # Grab the filing summary url so we can download it.
+    xml_summary = find_filing_summary(content)
+    if xml_summary is not None:
+        print('-' * 100)
+        print('File Name: FilingSummary.xml')
+        print('File Date: ' + filingDate)
+        print('File Path: ' + xml_summary)
 
     if xml_summary is None:
         '''sometimes if there is no Filing Summary in the filing, it's an amendment to the previous filing.
-        If this is the case, increase the counter by 1 and call the getFilingInfo() and get_filing_summary()
-        functions again.'''
-        counter += 1
-        ACC, filingDate = getFilingInfo(companyInfoDict['CIK'], counter, t)
-        xml_summary = get_filing_summary(companyInfoDict, ACC, counter, filingDate, t)
-        if type(xml_summary) is tuple:
-            '''I don't know why this creates a tuple'''
-            xml_summary = xml_summary[0]
-    return xml_summary, counter
+        If this is the case, select_statements_filing() checks the next few filings at once and picks the
+        most recent one that has statements.'''
+        found = select_statements_filing(companyInfoDict['CIK'], t, client, counter + 1)
+        if found is not None:
+            master_reports, counter, ACC, filingDate, xml_summary = found
+    return xml_summary, counter, ACC, filingDate
 
 """
 Parse the Filing Summary:
 """
-def parse_filing_summary(xml_summary, companyInfoDict, ACC, filingDate, counter):
+def parse_filing_summary(xml_summary, companyInfoDict, ACC, filingDate, counter, client = None, t = '10-k', parser = None):
     '''Now that we have the xml filing summary, this function parses it. The filing is divided up
     into sections called reports on the summary. Each report has a short name, long name, position,
     category, and url. To analyze financial statements, we are only looking for 4 of the reports in
@@ -255,195 +348,56 @@ def parse_filing_summary(xml_summary, companyInfoDict, ACC, filingDate, counter)
     At the end of this function, we make sure that the 'Statements' category is in the summary. If not,
     the filing is probably an appended version. Companies are allowed to publish an appended version
     of their filing later in the year if they need to wait for some reason to publish everything in their
-    initial filing. If this is the case, the function increases the 'counter' variable by 1, and it then
-    calls the getFilingInfo(), get_filing_summary(), and parse_filing_summary() functions again to get the
-    next most recent filing (yes, this is recursive – is there a better way?). Remember that in the getFilingInfo()
-    function, the default is to get the most recently published filing. Now with the counter variable as
-    the argument, we get the next most recent filing. When we start getting multiple filings, we need to
-    take this into account.'''
-    # If we need to download the reports, we can define a new url that represents the filing folder:
-    filingFolderURL = xml_summary.replace('FilingSummary.xml', '')
+    initial filing. If this is the case, the function hands off to select_statements_filing(), which checks
+    the next few filings after 'counter' at the same time and returns the most recent one that has statements.
+    Remember that in the getFilingInfo() function, the default is to get the most recently published filing.
+    When we start getting multiple filings, we need to take this into account.
+
+    parser picks the parser backend the summary is read with: 'bs4', 'lxml' or 'selectolax' (see SECparse.py).
+    The summary is only read until the four statements we want have been found, so master_reports stops
+    there too (see until_primary_statements() in SECparse.py).
+
+    Returns master_reports, counter, ACC, filingDate, xml_summary (those of the filing that was used in the end),
+    or None if xml_summary is None or no filing with statements was found.'''
+    if xml_summary is None:
+        return None
+    client = client or getClient()
 
     # request and parse the content
-    content = requests.get(xml_summary).content
-    soup = BeautifulSoup(content, 'lxml')
-
-    # find the 'myreports' tag because this contains all the individual reports submitted.
-    reports = soup.find('myreports')
-
-    # I want a list to store all the individual components of the report, so create the master list.
-    master_reports = []
-
-    # loop through each report in the 'myreports' tag but avoid the last one as this will cause an error.
-    for report in reports.find_all('report')[:-1]:
-
-        # let's create a dictionary to store all the different parts we need.
-        report_dict = {}
-        report_dict['name_short'] = report.shortname.text
-        report_dict['name_long'] = report.longname.text
-        report_dict['position'] = report.position.text
-        report_dict['category'] = report.menucategory.text
-        report_dict['url'] = filingFolderURL + report.htmlfilename.text
-
-        # append the dictionary to the master list.
-        master_reports.append(report_dict)
-
-        '''if report_dict['category'] == "Statements":
-            print('-'*100)
-            print("BASE URL:\n",base_url + report.htmlfilename.text)
-            print("LONGNAME:\n",report.longname.text)
-            print("SHORTNAME:\n",report.shortname.text)
-            print("MENU CATEGORY:\n",report.menucategory.text)
-            print("POSITION:\n",report.position.text)'''
-
-        # print the info to the user.
-        '''print('-'*100)
-        print("BASE URL:\n",base_url + report.htmlfilename.text)
-        #print("LONGNAME:\n",report.longname.text)
-        print("SHORTNAME:\n",report.shortname.text)
-        print("MENU CATEGORY:\n",report.menucategory.text)
-        print("POSITION:\n",report.position.text)'''
+    response = client.get(xml_summary)
+    response.raise_for_status()
+    content = response.content
+    master_reports = parse_reports(content, xml_summary, parser, stopEarly = True)
 
     # if the 10-k for some reason doesn't have the statements (if it's a 10-K/A), use the next most recent one
-    catList = []
-    for x in master_reports:
-        catList.append(x['category'])
-        
-    #think about adding a while iteration
-    if 'Statements' not in catList:
-        counter += 1
-        ACC, filingDate = getFilingInfo(companyInfoDict['CIK'], counter)
-        xml_summary = get_filing_summary(companyInfoDict['CIK'], ACC, counter, filingDate)
-        master_reports, counter, ACC, filingDate, xml_summary = parse_filing_summary(xml_summary, companyInfoDict['CIK'], ACC, filingDate, counter)
-        if counter > 5:
-            print("None of the entity's 6 most recent 10-K reports have financial statements.")
-            return
+    if not has_statements(master_reports):
+        return select_statements_filing(companyInfoDict['CIK'], t, client, counter + 1, parser = parser)
         
     return master_reports, counter, ACC, filingDate, xml_summary
     
-"""
-Grab the Financial Statements:
-"""
-def grab_financial_statements(master_reports):
-    '''Now that we have a master_reports list with multiple dictionaries (report_dict), we can find the financial
-    statements that we want and put their URL's into a list. First, we define the statements that we want from the
-    master_reports list.
-
-    It is very common for a company to list their financial statements in different orders, so it is very important
-    to record the order in which the statement URL's are listed. For this reason, we create the reportOrder
-    dictionary. This order is very important in the next functions.
-
-    The function then returns the list of URL's for each statement, as well as the reportOrder dictionary.'''
-    # create the list to hold the statement urls
-    statements_url = []
-
-    item1 = None
-    item2 = None
-    item3 = None
-    item4 = None
-
-    # define the statements we want to look for (defined as item1 - item4)
-    # consider changing master_reports to all caps if errors keep popping up and to decrease lines of code
-    for v in master_reports:
-        # BALANCE SHEET
-        if "Balance" in v['name_short']:
-            item1 = r"" + v['name_short']
-            break
-        elif "BALANCE" in v['name_short']:
-            item1 = r"" + v['name_short']
-            break
-
-    for v in master_reports:
-        # INCOME STATEMENT
-        if "Operations" in v['name_short']:
-            item2 = r"" + v['name_short']
-            break
-        if "OPERATIONS" in v['name_short']:
-            item2 = r"" + v['name_short']
-            break
-        elif "Income" in v['name_short']:
-            item2 = r"" + v['name_short']
-            break
-        elif "INCOME" in v['name_short']:
-            item2 = r"" + v['name_short']
-            break
-
-    for v in master_reports:
-        # STATEMENT OF CASH FLOWS
-        if "Cash" in v['name_short']:
-            item3 = r"" + v['name_short']
-            break
-        elif "CASH" in v['name_short']:
-            item3 = r"" + v['name_short']
-            break
-
-    for v in master_reports:
-        # STATEMENT OF STOCKHOLDERS EQUITY
-        if "Equity" in v['name_short']:
-            item4 = r"" + v['name_short']
-            break
-        elif "EQUITY" in v['name_short']:
-            item4 = r"" + v['name_short']
-            break
-    '''print("item1: ",item1)
-    print("item2: ",item2)
-    print("item3: ",item3)
-    print("item4: ",item4)'''
-
-    # store the statement names in a list
-    report_list = [item1, item2, item3, item4]
-    reportOrder = {}
-    n = 0
-    #create a list with all the keys below in the desired order instead of iteration for report order
-    for reportDict in master_reports:
-
-        # if the short name can be found in the report list.
-        if reportDict['name_short'] in report_list:
-
-            # record index position of financial statement
-            if "Balance" in reportDict['name_short']:
-                reportOrder['Balance Sheet'] = n
-            elif "BALANCE" in reportDict['name_short']:
-                reportOrder['Balance Sheet'] = n
-            elif "Operations" in reportDict['name_short']:
-                reportOrder['Income Statement'] = n
-            elif "OPERATIONS" in reportDict['name_short']:
-                reportOrder['Income Statement'] = n
-            elif "Income" in reportDict['name_short']:
-                reportOrder['Income Statement'] = n
-            elif "INCOME" in reportDict['name_short']:
-                reportOrder['Income Statement'] = n
-            elif "Cash" in reportDict['name_short']:
-                reportOrder['Statement of Cash Flows'] = n
-            elif "CASH" in reportDict['name_short']:
-                reportOrder['Statement of Cash Flows'] = n
-            elif "Equity" in reportDict['name_short']:
-                reportOrder["Statement of Stockholders' Equity"] = n
-            elif "EQUITY" in reportDict['name_short']:
-                reportOrder["Statement of Stockholders' Equity"] = n
-            n += 1
-
-            # print some info and store it in the statements url.
-            print('-'*100)
-            print(reportDict['name_short'])
-            print(reportDict['url'])
-                
-            statements_url.append(reportDict['url'])
-        
-    #print("Report List:\n",report_list)
-    #print("\nReport Order Dictionary:\n"+str(reportOrder))
-    return statements_url, reportOrder
-
 """
 Scrape the Financial Statements:
 """
-def scrape_financial_statements(statements_url, reportOrder):
+def scrape_financial_statements(statements_url, reportOrder, client = None, workers = 1, parser = None, excel = False):
     '''This function loops through the list of URL's created by the grab_financial_statements() function.
     For each URL, it requests the contents and uses BeautifulSoup to read it in html format. It puts content
     from statement headers into the headers list, statement sections into the sections list, and statement
     data into the data list. These 3 lists are inside of the statement_data dictionary. There's a different
     statement_data dictionary for each statement that the function loops through.
 
+    If workers is more than 1, all of the statement files are requested at the same time on a thread pool
+    (the client's rate limiter still spaces the requests out). Each statement is parsed as soon as its
+    response comes back, and it is put back in the same position as its URL, so statements_data is always
+    in the same order as reportOrder no matter which response arrives first.
+
+    parser picks the parser backend the statement files are read with: 'bs4', 'lxml' or 'selectolax' (see
+    SECparse.py). They all give the same statements_data; by default the fastest one installed is used.
+
+    If excel is True, the statements are read out of the filing's Financial_Report.xlsx instead, which has
+    every R file in it as a worksheet. That's one request for the whole filing instead of one per statement,
+    and no HTML to parse. If the filing doesn't have the workbook (or it can't be read), the statement files
+    are downloaded one by one like usual.
+
     If you're trying to understand the reportOrderKeys, you'll probably want to print reportOrder and
     reportOrderKeys. Since companies have different names for the same statements, this solves that issue. It
     may also be helpful to print out the statement_data dictionary at the end of the function to see how the
@@ -452,61 +406,45 @@ def scrape_financial_statements(statements_url, reportOrder):
     The final lines of the function that are blocked out also help to understand the contents of the
     statements_data list. This is essentially the master list with all the data from each statement that we
     want.'''
+    client = client or getClient()
+
     # let's assume we want all the statements in a single data set.
-    statements_data = []
+    statements_data = [None] * len(statements_url)
+    statementSections = [None] * len(statements_url)
     reportOrderKeys = list(reportOrder.keys())
-    n = 0
-    sectionData = {}
-
-    # loop through each statement url
-    for statement in statements_url:
 
-        # define a dictionary that will store the different parts of the statement.
-        statement_data = {}
-        statement_data['headers'] = []
-        statement_data['sections'] = []
-        statement_data['data'] = []
+    if excel:
+        try:
+            response = client.get(financial_report_url(statements_url))
+            response.raise_for_status()
+            for n, (statement_data, sectionRows) in enumerate(parse_financial_report(response.content, statements_url)):
+                statements_data[n], statementSections[n] = statement_data, sectionRows
+        except (requests.RequestException, zipfile.BadZipFile, ValueError, KeyError, IndexError) as e:
+            print("Couldn't read the statements out of Financial_Report.xlsx (" + str(e) + "). Downloading them one at a time.")
+            excel = False
+
+    if not excel:
+        if workers > 1:
+            # request every statement file at once and parse each one as its response arrives.
+            with ThreadPoolExecutor(max_workers = workers) as pool:
+                futures = {}
+                for n, statement in enumerate(statements_url):
+                    futures[pool.submit(client.get, statement)] = n
+                for future in as_completed(futures):
+                    n = futures[future]
+                    statements_data[n], statementSections[n] = parse_statement(future.result().content, parser)
+        else:
+            # loop through each statement url
+            for n, statement in enumerate(statements_url):
+
+                # request the statement file content
+                content = client.get(statement).content
+                statements_data[n], statementSections[n] = parse_statement(content, parser)
 
-        # count the rows of data under each section
-        sectionData[reportOrderKeys[n]] = {}
-        dataRows = 0
-        
-        # request the statement file content
-        content = requests.get(statement).content
-        report_soup = BeautifulSoup(content, 'html')
-
-        # find all the rows, figure out what type of row it is, parse the elements, and store in the statement file list.
-        for index, row in enumerate(report_soup.table.find_all('tr')):
-            
-            # first let's get all the elements.
-            cols = row.find_all('td')
-            
-            # if it's a regular row and not a section or a table header
-            if (len(row.find_all('th')) == 0 and len(row.find_all('strong')) == 0): 
-                reg_row = [ele.text.strip() for ele in cols]
-                statement_data['data'].append(reg_row)
-                dataRows += 1
-                
-            # if it's a regular row and a section but not a table header
-            elif (len(row.find_all('th')) == 0 and len(row.find_all('strong')) != 0):
-                sec_row = cols[0].text.strip()
-                statement_data['sections'].append(sec_row)
-                
-                sectionData[reportOrderKeys[n]][sec_row] = dataRows
-                dataRows = 0
-                
-            # finally if it's not any of those it must be a header
-            elif (len(row.find_all('th')) != 0):            
-                hed_row = [ele.text.strip() for ele in row.find_all('th')]
-                statement_data['headers'].append(hed_row)
-                
-            else:            
-                print('We encountered an error.')
-                
-        n += 1
+    sectionData = {}
+    for n in range(len(statements_url)):
+        sectionData[reportOrderKeys[n]] = statementSections[n]
 
-        # append it to the master list.
-        statements_data.append(statement_data)
     # some things to print to better understand this function:
     print("reportOrder Dictionary:\n"+str(reportOrder))
     print("reportOrderKeys List:\n"+str(reportOrderKeys))
@@ -522,391 +460,121 @@ def scrape_financial_statements(statements_url, reportOrder):
     print("-"*100)'''
     return statements_data
 
-def popFootnotes(df, n, result, contents):
-    # Get rid of footnotes – empty columns and bottom rows
-    '''PROBLEM: sometimes a financial statement has a footnote attached that doesn't
-    translate to pandas.
-    
-    SOLUTION: remove the column with the footnote reference, and all of the associated
-    footnote data (probably in the bottom three rows) from the dataframe. It is important to store that
-    deleted data somewhere else so that we can output it into excel or something.
-
-    METHOD: First put the footnote data into a dictionary (a list or tuple may actually be better).
-    The next step is to replace the footnote symbol [n] with NaN. There will now be an entire column
-    of NaN values that can be deleted. Then, delete the rows with the footnote data. After the dataframe
-    is saved to an excel worksheet, we can now insert the footnote data that was previously saved to
-    a dictionary into the bottom of the worksheet. This is an important last step, given that footnote
-    data is sometimes more relevant than the actual financial statement.
-    
-    This function finds the column in which the string '[n]' exists. It then finds the rows where
-    '[n]' exists. Then it creates a dictionary with the contents of the footnotes (this part probably
-    needs some work in case there is more than 1 footnote). Finally, it replaces the string '[n]' with
-    NaN.'''
-    
-    # get list of columns that contains the value
-    seriesObj = result.any()
-    columnNames = list(seriesObj[seriesObj == True].index)
-    #print("seriesObj:",seriesObj)
-    #print("columnNames:",columnNames)
-    
-    # Iterate over list of columns and fetch the rows indexes where value exists
-    for col in columnNames:
-        rows = list(result[col][result[col] == True].index)
-        for row in rows:
-            listOfPos.append((row, col))
-            
-    # make a dictionary with the contents of the footnotes
-    for x in range(len(listOfPos)):
-        footnoteDict[n] = listOfPos[x][0] #need to check to make sure this works when there are multiple footnotes
-
-    # replace [n] footnote symbols in data with NaN
-    symbol = str('[' + str(n) + ']')
-    df.replace(symbol, np.nan, inplace=True)
-            
-    # listOfPos is a list of tuples indicating the positions of footnotes in the dataframe
-    '''print("\nList of positions:\n",listOfPos)
-    print("\nLength of list:",len(listOfPos))
-    print("\nfootnote dict:\n",footnoteDict)
-    print("\nLength of dict:",len(footnoteDict))'''
-
-    # delete rows with the remaining footnote data
-    if n == 1:
+"""
+Scrape a whole filing in one request:
+"""
+def get_submission_documents(CIK, ACC, client = None, keep = is_statement_document):
+    '''Downloads the complete submission text file of the filing (<accession>.txt, every document of the
+    filing in one file) and returns a dictionary of file name to content for the documents keep(filename, type)
+    says to keep (by default the FilingSummary.xml and the R files). The file is streamed and split up as it
+    arrives (see iter_submission_documents() in SECparse.py), so the big documents we don't want, like the
+    10-K itself and the pictures, are never held in memory.'''
+    client = client or getClient()
+    response = client.get(submission_url(CIK, ACC), stream = True)
+    try:
+        response.raise_for_status()
+        documents = {}
+        for document in iter_submission_documents(response.iter_content(64 * 1024), keep):
+            documents[document.filename] = document.content
+        return documents
+    finally:
+        response.close()
+
+def scrape_submission(CIK, ACC, client = None, parser = None):
+    '''One request version of parse_filing_summary(), grab_financial_statements() and scrape_financial_statements():
+    everything is read out of the documents in the complete submission text file. Returns master_reports,
+    statements_url, reportOrder, statements_data, or None if the submission doesn't have a FilingSummary.xml
+    with a 'Statements' category (older filings and amendments usually don't).'''
+    documents = get_submission_documents(CIK, ACC, client)
+    if 'FilingSummary.xml' not in documents:
+        return None
+
+    xml_summary = filing_index_url(CIK, ACC).replace('index.json', 'FilingSummary.xml')
+    master_reports = parse_reports(documents['FilingSummary.xml'], xml_summary, parser, stopEarly = True)
+    if not has_statements(master_reports):
+        return None
+
+    statements_url, reportOrder = grab_financial_statements(master_reports)
+    statements_data = []
+    for statement in statements_url:
+        fileName = statement.rsplit('/', 1)[1]
+        if fileName not in documents:
+            return None
+        statements_data.append(parse_statement(documents[fileName], parser)[0])
+    return master_reports, statements_url, reportOrder, statements_data
+
+def report_footnotes(statementName, footnotes):
+    '''Prints the footnotes split_footnotes() took out of a statement (see SECstatements.py). The footnotes are
+    kept in the footnoteDict under the statement's name, because the footnote data is sometimes more relevant
+    than the actual financial statement.'''
+    if not footnotes:
         print("\nThere were no footnotes in the statement.\nContinuing execution as normal.\n")
-    elif n > 1:
-        print("\n\nFOOTNOTE FOUND")
-        print("NUMBER OF FOOTNOTES IN STATEMENT:",n-1)
-        print("DELETING THE BOTTOM",(n-1)*3,"LINES OF THE STATEMENT AS FOLLOWS:\n")
-        for i in range((n-1)*3):
-            indexes = df.index.tolist()
-            rowCount = df.shape[0]
-            print("\nRow number " + str(rowCount) + ":\n" + str(df.iloc[-1]))
-            df.drop(indexes[-1], inplace=True)
-        print("Rows successfully deleted")
-
-    return df, footnoteDict
+        return
+    print("\n\nFOOTNOTE FOUND")
+    print("NUMBER OF FOOTNOTES IN STATEMENT:", len(footnotes))
+    for number, footnote in footnotes.items():
+        print("[" + str(number) + "] " + str(footnote.text) + " (" + ", ".join(str(row) for row, column in footnote.positions) + ")")
 
 """
 Convert the Data into a Data Frame, then convert to excel:
 """
-def make_balSheet_df(statements_data, reportOrder):
-    '''In this function, we use Pandas to turn the balance sheet data (stored in the statements_data list)
-    into a dataframe. If a footnote is detected, the popFootnotes() function is called.'''
+def make_statement_dfs(statements_data, reportOrder):
+    '''In this function, we use Pandas to turn every financial statement in statements_data (the balance sheet,
+    income statement, statement of cash flows, and statement of stockholders' equity) into a dataframe in one
+    pass with build_statements() (see SECstatements.py): the footnotes are taken out, every cell is converted to
+    a float, the numbers are put in plain dollars, and the columns become the period end dates. Returns a
+    dictionary of statement name to dataframe, and the footnoteDict with each statement's footnotes under its name.
+
+    analysis() doesn't use the statement of stockholders' equity, and it has the most unusual layouts, so it is
+    built on its own: if its headers can't be lined up with its columns (a StatementLayoutError), its dataframe
+    is None and the other three statements are still used. Any other error is a bug and isn't caught.'''
     print("-"*50)
-    print("MAKE BALANCE SHEET:")
+    print("MAKE FINANCIAL STATEMENTS:")
     print("-"*50)
-    
-    # Grab the proper components
-    bal_headerLists = statements_data[reportOrder['Balance Sheet']]['headers']
-    #print(bal_headerLists)
-    bal_header = bal_headerLists.pop(0) #bal_headerLists is for some reason a list within a list. This removes the outside list.
-    #print("Header:\n"+str(bal_header))
-    title = bal_header[0]
-    bal_header = bal_header[1:]
-    bal_data = statements_data[reportOrder['Balance Sheet']]['data']
-
-    # Put the data in a DataFrame
-    balSheet_df = pd.DataFrame(bal_data)
-    
-    '''# Display
-    print('-'*100)
-    print('Before Reindexing')
-    print('-'*100)
-    print(balSheet_df.head())'''
-    
-    # Define the Index column, rename it, and we need to make sure to drop the old column once we reindex.
-    balSheet_df.index = balSheet_df[0]
-    balSheet_df.index.name = 'Category'
-    balSheet_df = balSheet_df.drop(0, axis = 1)
-    
-    '''# Display
-    print('-'*100)
-    print('Before Regex')
-    print('-'*100)
-    print(balSheet_df.head())'''
-    
-    # Get rid of the '$', '(', ')', and convert the '' to NaNs.
-    balSheet_df = balSheet_df.replace('[\$,)]','', regex=True )\
-                         .replace( '[(]','-', regex=True)\
-                         .replace( '', 'NaN', regex=True)
-
-    # Check for footnotes. If there are footnotes, the popFootnotes() function is called.
-    listOfPos = []
-    footnoteDict = {}
-    n = 0
-    while True:
-        n+=1
-        '''This iteration finds the '[n]' footnote if it exists. If not, the iteration ends. If it does exist,
-        the popFootnotes() function is called.'''
-        # get bool dataframe with True positions where the given value exists
-        result = balSheet_df.isin(['[' + str(n) + ']'])
-        contents = result.any(axis=None) #The while True iteration should stop after it finds all the footnotes.
-        #print("Contents " + str(n) + ":\n" + str(contents))
-        #print("Result " + str(n) + ":\n" + str(result))
-        if contents == False:
-            break
-        balSheet_df, footnoteDict = popFootnotes(balSheet_df, n, result, contents)
-
-    '''# Display
-    print('-'*100)
-    print('Before type conversion & removal of empty columns')
-    print('-'*100)
-    print(balSheet_df)'''
-
-    # Convert data type from string to float
-    balSheet_df = balSheet_df.astype(float)
-
-    # Delete columns that are only NaN, and change the column headers
-    balSheet_df.dropna(axis = 'columns', how = 'all', inplace=True)
-    balSheet_df.columns = bal_header
 
-    #Need to find a way to put section headers back into the dataframe...not of paramount importance
+    equity = "Statement of Stockholders' Equity"
+    statement_dfs, footnoteDict = build_statements(statements_data, reportOrder,
+                                                   [name for name in STATEMENT_NAMES if name != equity])
+    if equity in reportOrder:
+        try:
+            equity_dfs, equity_footnotes = build_statements(statements_data, reportOrder, [equity])
+            statement_dfs.update(equity_dfs)
+            footnoteDict.update(equity_footnotes)
+        except StatementLayoutError as e:
+            print("\nCouldn't make the " + equity.lower() + " (" + str(e) + "). Continuing without it.\n")
+            statement_dfs[equity] = None
+            footnoteDict[equity] = {}
+
+    for name, df in statement_dfs.items():
+        if df is None:
+            continue
+        print(name.upper() + " DATAFRAME SUCCESSFUL (" + str(df.shape[0]) + " rows, " + str(df.shape[1]) + " columns)")
+        report_footnotes(name, footnoteDict[name])
+    return statement_dfs, footnoteDict
+
+def make_statement_df(statements_data, reportOrder, name, footnoteDict = None):
+    '''Builds just one of the statements (see make_statement_dfs()), and adds its footnotes to footnoteDict.'''
+    statement_dfs, footnotes = build_statements(statements_data, reportOrder, [name])
+    if footnoteDict is None:
+        footnoteDict = {}
+    footnoteDict.update(footnotes)
+    return statement_dfs[name], footnoteDict
 
-    # Display
-    print('-'*100)
-    print('Final Product')
-    print('-'*100)
-    print(balSheet_df)                
-    
-    print("BALANCE SHEET DATAFRAME SUCCESSFUL")
-    return balSheet_df, footnoteDict
+def make_balSheet_df(statements_data, reportOrder):
+    '''The balance sheet on its own (see make_statement_dfs()).'''
+    return make_statement_df(statements_data, reportOrder, 'Balance Sheet')
 
 def make_income_df(statements_data, reportOrder, footnoteDict):
-    '''In this function, we use Pandas to turn the income statement data (stored in the statements_data list)
-    into a dataframe. If a footnote is detected, the popFootnotes() function is called.'''
-    print("-"*50)
-    print("MAKE INCOME STATEMENT:")
-    print("-"*50)
-    # Grab the proper components
-    income_header =  statements_data[reportOrder['Income Statement']]['headers'][1]
-    income_data = statements_data[reportOrder['Income Statement']]['data']
-    #print("income header:\n",income_header)
-    #print("income data:\n",income_data)
-
-    # Put the data in a DataFrame
-    income_df = pd.DataFrame(income_data)
-    
-    '''# Display
-    print('-'*100)
-    print('Before Reindexing')
-    print('-'*100)
-    print(income_df.head())'''
-    
-    # Define the Index column, rename it, and we need to make sure to drop the old column once we reindex.
-    income_df.index = income_df[0]
-    income_df.index.name = 'Category'
-    income_df = income_df.drop(0, axis = 1)
-    
-    '''# Display
-    print('-'*100)
-    print('Before Regex')
-    print('-'*100)
-    print(income_df.head())'''
-    
-    # Get rid of the '$', '(', ')', and convert the '' to NaNs.
-    income_df = income_df.replace('[\$,)]','', regex=True )\
-                         .replace( '[(]','-', regex=True)\
-                         .replace( '', 'NaN', regex=True)
-
-    # Check for footnotes. If there are footnotes, the popFootnotes() function is called.
-    listOfPos = []
-    n = 0
-    while True:
-        n+=1
-        '''This iteration finds the '[n]' footnote if it exists. If not, the iteration ends. If it does exist,
-        the popFootnotes() function is called.'''
-        # get bool dataframe with True positions where the given value exists
-        result = income_df.isin(['[' + str(n) + ']'])
-        contents = result.any(axis=None) #The while True iteration should stop after it finds all the footnotes.
-        #print("Contents " + str(n) + ":\n" + str(contents))
-        #print("Result " + str(n) + ":\n" + str(result))
-        if contents == False:
-            break
-        income_df, footnoteDict = popFootnotes(income_df, n, result, contents)
-    
-    '''# Display
-    print('-'*100)
-    print('Before type conversion')
-    print('-'*100)
-    print(income_df.head())'''
-    
-    # everything is a string, so let's convert all the data to a float.
-    income_df = income_df.astype(float)
-
-    # Change the column headers
-    income_df.columns = income_header
-
-    # Display
-    print('-'*100)
-    print('Final Product')
-    print('-'*100)
-    print(income_df)    
-    
-    """# convert pandas dataframe into excel worksheet
-    wsIncome = wb.create_sheet("Statement of Net Income (Loss)")
-    for r in dataframe_to_rows(income_df, index=True, header=True):
-        wsIncome.append(r)"""
-    print("INCOME STATEMENT DATAFRAME SUCCESSFUL")
-    return income_df, footnoteDict
+    '''The income statement on its own (see make_statement_dfs()).'''
+    return make_statement_df(statements_data, reportOrder, 'Income Statement', footnoteDict)
 
 def make_cashFlow_df(statements_data, reportOrder, footnoteDict):
-    '''In this function, we use Pandas to turn the cash flow statement data (stored in the statements_data list)
-    into a dataframe. If a footnote is detected, the popFootnotes() function is called.'''
-    print("-"*50)
-    print("MAKE CASH FLOW STATEMENT:")
-    print("-"*50)
-    # Grab the proper components
-    cashFlow_header =  statements_data[reportOrder['Statement of Cash Flows']]['headers'][1]
-    cashFlow_data = statements_data[reportOrder['Statement of Cash Flows']]['data']
-    #print("Cash flow header:\n",cashFlow_header)
-    #print("Cash flow data:\n",cashFlow_data)
-    
-    # Put the data in a DataFrame
-    cashFlow_df = pd.DataFrame(cashFlow_data)
-    
-    '''# Display
-    print('-'*100)
-    print('Before Reindexing')
-    print('-'*100)
-    print(cashFlow_df.head())'''
-    
-    # Define the Index column, rename it, and we need to make sure to drop the old column once we reindex.
-    cashFlow_df.index = cashFlow_df[0]
-    cashFlow_df.index.name = 'Category'
-    cashFlow_df = cashFlow_df.drop(0, axis = 1)
-    
-    '''# Display
-    print('-'*100)
-    print('Before Regex')
-    print('-'*100)
-    print(cashFlow_df.head())'''
-    
-    # Get rid of the '$', '(', ')', and convert the '' to NaNs.
-    cashFlow_df = cashFlow_df.replace('[\$,)]','', regex=True )\
-                         .replace( '[(]','-', regex=True)\
-                         .replace( '', 'NaN', regex=True)
-
-    # Check for footnotes. If there are footnotes, the popFootnotes() function is called.
-    listOfPos = []
-    n = 0
-    while True:
-        n+=1
-        '''This iteration finds the '[n]' footnote if it exists. If not, the iteration ends. If it does exist,
-        the popFootnotes() function is called.'''
-        # get bool dataframe with True positions where the given value exists
-        result = cashFlow_df.isin(['[' + str(n) + ']'])
-        contents = result.any(axis=None) #The while True iteration should stop after it finds all the footnotes.
-        #print("Contents " + str(n) + ":\n" + str(contents))
-        #print("Result " + str(n) + ":\n" + str(result))
-        if contents == False:
-            break
-        cashFlow_df, footnoteDict = popFootnotes(cashFlow_df, n, result, contents)
-    
-    '''# Display
-    print('-'*100)
-    print('Before type conversion')
-    print('-'*100)
-    print(cashFlow_df.head())'''
-    
-    # everything is a string, so let's convert all the data to a float.
-    cashFlow_df = cashFlow_df.astype(float)
-
-    # Change the column headers
-    cashFlow_df.columns = cashFlow_header
-
-    # Display
-    print('-'*50)
-    print('Final Product')
-    print('-'*50)
-    print(cashFlow_df)    
-    
-    """# convert pandas dataframe into excel worksheet
-    wsCashFlow = wb.create_sheet("Statement of Cash Flows")
-    for r in dataframe_to_rows(cashFlow_df, index=True, header=True):
-        wsCashFlow.append(r)"""
-    print("STATEMENT OF CASH FLOWS DATAFRAME SUCCESSFUL")
-    return cashFlow_df, footnoteDict
+    '''The statement of cash flows on its own (see make_statement_dfs()).'''
+    return make_statement_df(statements_data, reportOrder, 'Statement of Cash Flows', footnoteDict)
 
 def make_equity_df(statements_data, reportOrder, footnoteDict):
-    '''In this function, we use Pandas to turn the statement of owners equity data (stored in
-    the statements_data list) into a dataframe. If a footnote is detected, the popFootnotes()
-    function is called.'''
-    print("-"*50)
-    print("MAKE EQUITY STATEMENT:")
-    print("-"*50)
-    # Grab the proper components
-    equity_header =  statements_data[reportOrder["Statement of Stockholders' Equity"]]['headers'][0] #this is a list within a list. Should change this so that the [0] is not needed
-    equity_header.pop(0) #removes the first element from the list
-    print("equity_header:", equity_header)
-    equity_data = statements_data[reportOrder["Statement of Stockholders' Equity"]]['data']
-    #print("Equity header: ",equity_header)
-    #print("Equity_data: ",equity_data)
-    
-    # Put the data in a DataFrame
-    equity_df = pd.DataFrame(equity_data)
-    
-    # Display
-    print('-'*100)
-    print('Before Reindexing')
-    print('-'*100)
-    print(equity_df.head())
-    
-    # Define the Index column, rename it, and we need to make sure to drop the old column once we reindex.
-    equity_df.index = equity_df[0]
-    equity_df.index.name = 'Category'
-    equity_df = equity_df.drop(0, axis = 1)
-    
-    # Display
-    print('-'*100)
-    print('Before Regex')
-    print('-'*100)
-    print(equity_df.head())
-    
-    # Get rid of the '$', '(', ')', and convert the '' to NaNs.
-    equity_df = equity_df.replace('[\$,)]','', regex=True )\
-                         .replace( '[(]','-', regex=True)\
-                         .replace( '', 'NaN', regex=True)
-
-    # Check for footnotes. If there are footnotes, the popFootnotes() function is called.
-    listOfPos = []
-    n = 0
-    while True:
-        n+=1
-        '''This iteration finds the '[n]' footnote if it exists. If not, the iteration ends. If it does exist,
-        the popFootnotes() function is called.'''
-        # get bool dataframe with True positions where the given value exists
-        result = equity_df.isin(['[' + str(n) + ']'])
-        contents = result.any(axis=None) #The while True iteration should stop after it finds all the footnotes.
-        #print("Contents " + str(n) + ":\n" + str(contents))
-        #print("Result " + str(n) + ":\n" + str(result))
-        if contents == False:
-            break
-        equity_df, footnoteDict = popFootnotes(equity_df, n, result, contents)
-    
-    # Display
-    print('-'*100)
-    print('Before type conversion')
-    print('-'*100)
-    print(equity_df.head())
-    
-    # everything is a string, so let's convert all the data to a float.
-    equity_df = equity_df.astype(float)
-
-    # Change the column headers
-    equity_df.columns = equity_header
-
-    # Display
-    print('-'*100)
-    print('Final Product')
-    print('-'*100)
-    print(equity_df)
-
-    
-    """# convert pandas dataframe into excel worksheet
-    wsEquity = wb.create_sheet("Statement of Stockholders' Equity")
-    for r in dataframe_to_rows(equity_df, index=True, header=True):
-       wsEquity.append(r)"""
-    print("STATEMENT OF STOCKHOLDERS' EQUITY DATAFRAME SUCCESSFUL")
-    return equity_df, footnoteDict
+    '''The statement of stockholders' equity on its own (see make_statement_dfs()).'''
+    return make_statement_df(statements_data, reportOrder, "Statement of Stockholders' Equity", footnoteDict)
 
 """
 Perform Financial Analyses
@@ -1340,7 +1008,8 @@ def analysis(balSheet_df, income_df, cashFlow_df, companyInfoDict, dirPath, fili
     tse2 = None
     tlKeys = ["Total liabilities","Total Liabilities"]
     for x in range(len(tlKeys)):
-        tlName = [i for i in balSheetRows if tlKeys[x] in i]
+        # not the 'Total liabilities and equity' row, which is what total liabilities are worked out from below
+        tlName = [i for i in balSheetRows if tlKeys[x] in i and 'equity' not in i.lower()]
         if len(tlName) == 1:
             print("\n\nUsing '" + tlName[0] + "' as the account for Total Liabilities.")
             tl1 = balSheet_df.loc[tlName[0],balSheetHeaders[0]]
@@ -1428,12 +1097,17 @@ def main():
     ticker = str(input("Enter the ticker: ")).upper() #takes ticker as input, converts to upper case
     counter = 0 #this will be used in getFilingInfo(), get_filing_summary() and parse_filing_summary()
     t = '10-k' #we are looking for 10-k filings
+    excel = False #set to True to read all of the statements out of the filing's Financial_Report.xlsx in one request
+    xbrl = False #set to True to get the numbers from SEC's XBRL companyfacts api (one request) instead of the filing
+    inline = False #set to True to get the numbers from the inline XBRL tags in the filing's 10-K .htm instead of the R files
+    submission = False #set to True to read the summary and the statements out of the filing's complete submission .txt in one request
+    client = getClient() #one pooled connection to SEC Edgar shared by every request below
     
     # use ticker to find its associated CIK
-    CIK = getCIK(ticker)
+    CIK = getCIK(ticker, client)
     
     # get Accession number of the most recent 10k filing
-    ACC, filingDate = getFilingInfo(CIK, counter, t)
+    ACC, filingDate = getFilingInfo(CIK, counter, t, client)
 
     # Create a directory path for the company's data to be stored if it doesn't already exist.
     dirPath = (os.path.expanduser('~/Desktop/Python Finance/Output 10-K Analysis/' + ticker))
@@ -1441,28 +1115,65 @@ def main():
         os.makedirs(dirPath)
 
     # make a dictionary of the company's info
-    companyInfoDict, companyName = getCompanyInfo(CIK, ticker)
-
-    # get_filing_summary()
-    xml_summary, counter = get_filing_summary(companyInfoDict, ACC, counter, filingDate, t)
-    
-    # parse_filing_summary()
-    master_reports, counter, ACC, filingDate, xml_summary = parse_filing_summary(xml_summary, CIK, ACC, filingDate, counter)
-
-    #grab_financial_statements()
-    statements_url, reportOrder = grab_financial_statements(master_reports)
-
-    #scrape_financial_statements()
-    statements_data = scrape_financial_statements(statements_url, reportOrder)
-
-    # make the pandas dataframes
-    balSheet_df, footnoteDict = make_balSheet_df(statements_data, reportOrder)
-    print("\n\n")
-    income_df, footnoteDict = make_income_df(statements_data, reportOrder, footnoteDict)
-    print("\n\n")
-    cashFlow_df, footnoteDict = make_cashFlow_df(statements_data, reportOrder, footnoteDict)
-    print("\n\n")
-    #equity_df, footnoteDict = make_equity_df(statements_data, reportOrder, footnoteDict)
+    companyInfoDict, companyName = getCompanyInfo(CIK, ticker, client)
+
+    # the numbers can also come straight from the company's XBRL facts, which have every year in one request
+    if xbrl:
+        facts = getCompanyFacts(CIK, client)
+        filingDate = facts.latestFiled()
+        if filingDate is None:
+            print("There are no 10-K's in " + ticker + "'s XBRL facts.")
+            return
+        balSheet_df, income_df, cashFlow_df = facts.statements()
+        analysis(balSheet_df, income_df, cashFlow_df, companyInfoDict, dirPath, filingDate, ticker)
+        return
+
+    # the summary and the statements can also be read out of the filing's complete submission text file in one
+    # request. If the most recent filing doesn't have them there (like an amendment), the filing summary is used.
+    scraped = None
+    if submission:
+        try:
+            scraped = scrape_submission(CIK, ACC, client)
+        except (requests.RequestException, ValueError) as e:
+            print("Couldn't read the filing's complete submission text file (" + str(e) + ").")
+        if scraped is None:
+            print("The submission file doesn't have the statements, so the filing summary is used instead.")
+
+    if scraped is not None:
+        master_reports, statements_url, reportOrder, statements_data = scraped
+    else:
+        # find the most recent filing that has financial statements, and parse its filing summary
+        found = select_statements_filing(CIK, t, client, counter)
+        if found is None:
+            return
+        master_reports, counter, ACC, filingDate, xml_summary = found
+
+        # the numbers can also be read straight out of the inline XBRL tags in the 10-K document itself
+        if inline:
+            response = client.get(xml_summary)
+            response.raise_for_status()
+            document_url = find_primary_document(response.content, xml_summary)
+            if document_url is not None:
+                response = client.get(document_url)
+                response.raise_for_status()
+                facts = inlineCompanyFacts(response.content, CIK, ACC, filed = filingDate)
+                balSheet_df, income_df, cashFlow_df = facts.statements()
+                analysis(balSheet_df, income_df, cashFlow_df, companyInfoDict, dirPath, filingDate, ticker)
+                return
+            print("The filing doesn't list its primary document, so the statement files are used instead.")
+
+        #grab_financial_statements()
+        statements_url, reportOrder = grab_financial_statements(master_reports)
+
+        #scrape_financial_statements()
+        statements_data = scrape_financial_statements(statements_url, reportOrder, client, workers = 4, excel = excel)
+
+    # make the pandas dataframes of every statement in one pass
+    statement_dfs, footnoteDict = make_statement_dfs(statements_data, reportOrder)
+    balSheet_df = statement_dfs['Balance Sheet']
+    income_df = statement_dfs['Income Statement']
+    cashFlow_df = statement_dfs['Statement of Cash Flows']
+    equity_df = statement_dfs.get("Statement of Stockholders' Equity") #None if the filing doesn't have one
     print("\n\n")
 
     # use the financial statement dataframes to perform analysis on the company; save analysis to a csv file.
@@ -18,16 +18,13 @@ getCIK()
 
 
 '''
+The batch lookup now lives in SECtickers.py and reads the local ticker index built from
+company_tickers.json instead of downloading one browse-edgar page per ticker:
+
+from SECtickers import getCIKs as indexCIKs
+
 def getCIKs(TICKERS):
-    URL = 'http://www.sec.gov/cgi-bin/browse-edgar?CIK={}&Find=Search&owner=exclude&action=getcompany'
-    CIK_RE = re.compile(r'.*CIK=(\d{10}).*')    
-    cik_dict = {}
-    for ticker in TICKERS:
-        f = requests.get(URL.format(ticker), stream = True)
-        results = CIK_RE.findall(f.text)
-        if len(results):
-            results[0] = int(re.sub('\.[0]*', '.', results[0]))
-            cik_dict[str(ticker).upper()] = str(results[0])
+    cik_dict = indexCIKs(TICKERS)
     f = open('cik_dict', 'w')   
     print(cik_dict)
     f.close()
@@ -0,0 +1,323 @@
+'''
+Author: Marshall Jones
+Filename: SECasync
+
+Description:
+This is the asyncio version of the 10kAnalysis chain: getCIK -> getFilingInfo -> get_filing_summary ->
+parse_filing_summary -> grab_financial_statements -> scrape_financial_statements. Every download is a
+coroutine on one event loop, so hundreds or thousands of filings can be in flight at the same time without
+a thread for each one.
+
+The AsyncEdgarClient keeps one aiohttp session with a pool of keep-alive connections (like the EdgarClient
+in SECclient.py), sends the same User-Agent, and waits on the same token bucket (see SECratelimit.py), so the
+async and the regular version share SEC's 10 requests per second between them. A semaphore bounds how many
+requests can be waiting on SEC at once. Files in the archives are served from the same ArchiveCache (see
+SECcache.py) as the regular client, and pages that change over time from the same RevalidatingCache.
+
+All of the parsing is done by the same functions in SECparse.py that 10kAnalysis uses. The parsing, the reads
+and writes of the disk cache, and taking a token from the rate limiter (which can wait on a file lock) all
+block, so they are run on worker threads with asyncio.to_thread, and the event loop is only ever waiting on
+the network. Otherwise every other coroutine would stop while one R file is parsed.
+
+Example:
+    async with AsyncEdgarClient() as client:
+        results = await analyze_many(['KO', 'T', 'VZ'], client)
+'''
+# import libraries
+import asyncio
+import json
+import zipfile
+import aiohttp
+from SECclient import POOL_SIZE, getUserAgent
+from SECcache import CACHE_DIR, ArchiveCache, RevalidatingCache, AsyncSingleFlight, cacheKey, getNoStatementsRecord
+from SECratelimit import getLimiter
+from SECtickers import findCIK
+from SECparse import FilingList, parse_cik, make_filing_list_soup, parse_filing_entries, parse_company_info, filing_index_url, \
+     find_filing_summary, parse_reports, has_statements, grab_financial_statements, parse_statement, has_next_page, \
+     is_amendment, pick_candidates, candidate_stages, financial_report_url, parse_financial_report
+
+# how many of a company's most recent filings to try before giving up on finding financial statements
+MAX_TRIES = 6
+
+# every request for a filing list page on the event loop goes through here (see requestFilingListPage)
+filingListFlight = AsyncSingleFlight(ttl = 300)
+
+# and every parsed FilingList (see getFilingList)
+filingListsFlight = AsyncSingleFlight(ttl = 300)
+
+
+class AsyncEdgarClient(object):
+
+    def __init__(self, userAgent = None, poolSize = POOL_SIZE, concurrency = 50, timeout = 30, limiter = None,
+                 cacheDir = CACHE_DIR):
+        '''poolSize is how many connections are kept open to SEC, and concurrency is how many requests can be
+        waiting on SEC (or on the rate limiter) at once. Anything past that waits its turn on the semaphore.
+        cacheDir is where the downloaded files are cached; set it to None to turn the cache off. userAgent is
+        your name and email address, like in the EdgarClient (see getUserAgent() in SECclient.py).'''
+        self.userAgent = getUserAgent(userAgent)
+        self.poolSize = poolSize
+        self.timeout = timeout
+        self.limiter = limiter or getLimiter()
+        self.archiveCache = ArchiveCache(cacheDir) if cacheDir is not None else None
+        self.mutableCache = RevalidatingCache(cacheDir) if cacheDir is not None else None
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+
+    async def open(self):
+        '''Creates the aiohttp session. This has to happen inside of a running event loop.'''
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit = self.poolSize)
+            self.session = aiohttp.ClientSession(
+                connector = connector,
+                headers = {'User-Agent': self.userAgent, 'Accept-Encoding': 'gzip, deflate'},
+                timeout = aiohttp.ClientTimeout(total = self.timeout),
+            )
+        return self
+
+    async def fetch(self, url, params = None):
+        '''Downloads the url and returns the raw content (bytes). Files in the archives come out of the cache
+        if they have been downloaded before.'''
+        immutable = self.archiveCache is not None and params is None and self.archiveCache.isImmutable(url)
+        if immutable:
+            content = await asyncio.to_thread(self.archiveCache.get, url)
+            if content is not None:
+                return content
+
+        if not immutable and self.mutableCache is not None:
+            key = cacheKey(url, params)
+            if self.mutableCache.ttlFor(key) is not None:
+                return await self._fetchRevalidated(key, url, params)
+
+        status, headers, content = await self._send(url, params)
+        if immutable:
+            await asyncio.to_thread(self.archiveCache.put, url, content)
+        return content
+
+    async def _fetchRevalidated(self, key, url, params = None):
+        '''Async version of EdgarClient._getRevalidated() in SECclient.py.'''
+        entry = await asyncio.to_thread(self.mutableCache.get, key)
+        conditional = None
+        if entry is not None:
+            if self.mutableCache.isFresh(key, entry):
+                return entry['content']
+            conditional = self.mutableCache.conditionalHeaders(entry)
+
+        status, headers, content = await self._send(url, params, conditional)
+        if status == 304 and entry is not None:
+            await asyncio.to_thread(self.mutableCache.touch, key, entry)
+            return entry['content']
+        await asyncio.to_thread(self.mutableCache.put, key, content, headers)
+        return content
+
+    async def _send(self, url, params = None, headers = None):
+        '''Sends the request to SEC and returns the status, headers and content of the response. It waits on
+        the semaphore and then on the rate limiter before the request goes out. A 304 is returned as is,
+        anything else that isn't a success raises.'''
+        await self.open()
+        async with self.semaphore:
+            await self.limiter.acquireAsync()
+            async with self.session.get(url, params = params, headers = headers) as response:
+                if response.status == 304:
+                    return response.status, response.headers, b''
+                response.raise_for_status()
+                return response.status, response.headers, await response.read()
+
+    async def fetch_json(self, url, params = None):
+        '''Downloads the url and decodes it as json.'''
+        content = await self.fetch(url, params)
+        return await asyncio.to_thread(json.loads, content)
+
+    async def close(self):
+        '''Closes the session and all of its pooled connections.'''
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+async def getCIK(ticker, client):
+    '''Async version of getCIK() in 10kAnalysis. The ticker index is loaded (or refreshed) on a worker
+    thread so the event loop doesn't wait on it.'''
+    CIK = await asyncio.to_thread(findCIK, ticker)
+    if CIK is not None:
+        return CIK
+
+    URL = 'https://www.sec.gov/cgi-bin/browse-edgar?CIK={}&Find=Search&owner=exclude&action=getcompany'
+    content = await client.fetch(URL.format(ticker))
+    return await asyncio.to_thread(parse_cik, content.decode('utf-8', 'replace'), ticker)
+
+async def requestFilingListPage(CIK, t, client, start = 0):
+    '''Async version of requestFilingListPage() in 10kAnalysis. Returns the soup of the atom feed. Requests for
+    the same CIK and document type share one download and one soup.'''
+    key = (str(CIK).lstrip('0'), str(t).upper(), int(start))
+    return await filingListFlight.do(key, lambda: fetchFilingListPage(CIK, t, client, start))
+
+async def fetchFilingListPage(CIK, t, client, start = 0):
+    '''Downloads and parses the filing list page.'''
+    browse_edgar = r"https://www.sec.gov/cgi-bin/browse-edgar"
+    search_params = {
+        'CIK':CIK,
+        'Count':'100',
+        'myowner':'include',
+        'action':'getcompany',
+        'type':t,
+        'output':'atom',
+    }
+    if start:
+        search_params['start'] = str(start)
+    content = await client.fetch(browse_edgar, search_params)
+    return await asyncio.to_thread(make_filing_list_soup, content)
+
+async def iterFilingEntries(CIK, t, client):
+    '''Async version of iterFilingEntries() in 10kAnalysis: an async generator of (accession number, info)
+    pairs, newest first, that only asks for the next page of the list when the caller wants it. Like there,
+    only the first page is shared through filingListFlight, and the later ones are fetched straight so they
+    don't pile up in it.'''
+    start = 0
+    while True:
+        if start == 0:
+            soup = await requestFilingListPage(CIK, t, client)
+        else:
+            soup = await fetchFilingListPage(CIK, t, client, start)
+        ACClist, masterListXML = await asyncio.to_thread(parse_filing_entries, soup)
+        for ACC, entry_dict in zip(ACClist, masterListXML):
+            yield ACC, entry_dict[ACC]
+
+        if len(ACClist) == 0 or not has_next_page(soup):
+            return
+        start += len(ACClist)
+
+async def getFilingList(CIK, t, client):
+    '''Async version of getFilingList() in 10kAnalysis (first page only).'''
+    key = (str(CIK).lstrip('0'), str(t).upper(), False)
+    async def build():
+        soup = await requestFilingListPage(CIK, t, client)
+        return await asyncio.to_thread(FilingList.fromSoup, soup)
+    return await filingListsFlight.do(key, build)
+
+async def getFilingInfo(CIK, counter, t, client):
+    '''Async version of getFilingInfo() in 10kAnalysis.'''
+    filing = (await getFilingList(CIK, t, client))[counter]
+    return filing.accession, filing.date
+
+async def getCompanyInfo(CIK, ticker, client):
+    '''Async version of getCompanyInfo() in 10kAnalysis.'''
+    soup = await requestFilingListPage(CIK, '10-k', client)
+    info_dict = await asyncio.to_thread(parse_company_info, soup, ticker)
+    return info_dict, info_dict['nameInfo']['Name']
+
+async def get_filing_summary(CIK, ACC, client):
+    '''Downloads the index.json of the filing and returns the url of its FilingSummary.xml, or None if it
+    doesn't have one.'''
+    content = await client.fetch_json(filing_index_url(CIK, ACC))
+    return find_filing_summary(content)
+
+async def parse_filing_summary(xml_summary, client, parser = None):
+    '''Downloads the FilingSummary.xml and returns the master_reports list.'''
+    content = await client.fetch(xml_summary)
+    return await asyncio.to_thread(parse_reports, content, xml_summary, parser, stopEarly = True)
+
+async def check_candidate(CIK, filing, client, parser = None):
+    '''Async version of check_candidate() in 10kAnalysis. Returns (xml_summary, master_reports), or None if
+    the filing doesn't have a FilingSummary.xml with a 'Statements' category.'''
+    xml_summary = await get_filing_summary(CIK, filing.accession, client)
+    if xml_summary is None:
+        return None
+    master_reports = await parse_filing_summary(xml_summary, client, parser)
+    if not has_statements(master_reports):
+        return None
+    return xml_summary, master_reports
+
+async def find_statements_filing(CIK, t, client, maxTries = MAX_TRIES, counter = 0, skipAmendments = True, record = None,
+                                 parser = None):
+    '''Async version of select_statements_filing() in 10kAnalysis. Amendments and filings already known not to
+    have statements are skipped without downloading anything, then the next maxTries filings (starting at
+    counter) are checked in stages (see candidate_stages() in SECparse.py), and the newest one that has a FilingSummary.xml with a
+    'Statements' category wins. The ones that don't are added to the record. The ones that couldn't be checked
+    (a failed download or parse) are skipped without being recorded.
+
+    Returns master_reports, counter, ACC, filingDate, xml_summary, just like parse_filing_summary() in 10kAnalysis,
+    or None if none of them have statements.'''
+    if record is None:
+        record = getNoStatementsRecord()
+
+    def skip(filing):
+        amendment = is_amendment(filing.type)
+        return (skipAmendments and amendment) or record.isUseless(CIK, filing, amendment)
+
+    picked = pick_candidates(await getFilingList(CIK, t, client), counter, maxTries, skip)
+    for stage in candidate_stages(picked):
+        results = await asyncio.gather(*[check_candidate(CIK, filing, client, parser) for n, filing in stage],
+                                       return_exceptions = True)
+
+        for (n, filing), found in zip(stage, results):
+            if isinstance(found, Exception):
+                print("Couldn't check the filing from " + filing.date + " (" + str(found) + "). Trying the next one.")
+                continue
+            if found is None:
+                record.record(CIK, filing, is_amendment(filing.type))
+                continue
+            xml_summary, master_reports = found
+            return master_reports, n, filing.accession, filing.date, xml_summary
+
+    print("None of the entity's " + str(maxTries) + " most recent " + t + " reports have financial statements.")
+    return None
+
+async def scrape_financial_statements(statements_url, reportOrder, client, parser = None, excel = False):
+    '''Async version of scrape_financial_statements() in 10kAnalysis. Every statement file is requested at the
+    same time and parsed as soon as it arrives. statements_data comes back in the same order as statements_url,
+    so it still lines up with reportOrder. If excel is True, the statements are read out of the filing's
+    Financial_Report.xlsx in one request instead, when it has one.'''
+    if excel:
+        try:
+            content = await client.fetch(financial_report_url(statements_url))
+            statements = await asyncio.to_thread(parse_financial_report, content, statements_url)
+            return [statement_data for statement_data, sectionRows in statements]
+        except (aiohttp.ClientError, zipfile.BadZipFile, ValueError, KeyError, IndexError) as e:
+            print("Couldn't read the statements out of Financial_Report.xlsx (" + str(e) + "). Downloading them one at a time.")
+
+    statements_data = [None] * len(statements_url)
+
+    async def scrape(n, statement):
+        content = await client.fetch(statement)
+        statements_data[n] = (await asyncio.to_thread(parse_statement, content, parser))[0]
+
+    await asyncio.gather(*[scrape(n, statement) for n, statement in enumerate(statements_url)])
+    return statements_data
+
+async def analyze_filing(ticker, client, t = '10-k', parser = None):
+    '''Runs the whole chain for one ticker. Returns a dictionary with the company info, the filing that was
+    used, and the statements_data and reportOrder that the make_*_df functions in 10kAnalysis take. parser
+    picks the parser backend (see SECparse.py).'''
+    ticker = str(ticker).upper()
+    CIK = await getCIK(ticker, client)
+    companyInfoDict, companyName = await getCompanyInfo(CIK, ticker, client)
+
+    found = await find_statements_filing(CIK, t, client, parser = parser)
+    if found is None:
+        return None
+    master_reports, counter, ACC, filingDate, xml_summary = found
+
+    statements_url, reportOrder = grab_financial_statements(master_reports)
+    statements_data = await scrape_financial_statements(statements_url, reportOrder, client, parser)
+
+    return {
+        'ticker': ticker,
+        'companyInfoDict': companyInfoDict,
+        'ACC': ACC,
+        'filingDate': filingDate,
+        'reportOrder': reportOrder,
+        'statements_data': statements_data,
+    }
+
+async def analyze_many(tickers, client, t = '10-k', parser = None):
+    '''Runs analyze_filing() for every ticker on the same event loop. Returns a dictionary of ticker to result.
+    A ticker that fails gets its exception as its result instead of stopping the rest of them.'''
+    results = await asyncio.gather(*[analyze_filing(ticker, client, t, parser) for ticker in tickers],
+                                   return_exceptions = True)
+    return dict(zip([str(ticker).upper() for ticker in tickers], results))
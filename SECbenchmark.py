@@ -0,0 +1,175 @@
+'''
+Author: Marshall Jones
+Filename: SECbenchmark
+
+Description:
+Runs every parser backend in SECparse.py (BeautifulSoup, lxml, and selectolax, whichever are installed) over
+a folder of statement files (R2.htm, R4.htm, etc.) and FilingSummary.xml files, and prints how they compare:
+    - whether each backend gives exactly the same output as BeautifulSoup (the original parser)
+    - how many table rows (or reports, for the summaries) it parses per second
+    - how much memory it needed on top of what the process was already using
+Each backend runs in a brand new process, so the memory numbers of one can't leak into the next one.
+
+With no folder it runs over the fixtures folder next to this file, which has one subfolder per filing
+(named by accession number) with trimmed copies of the statement files and the FilingSummary.xml of
+three 10-Ks (Coca-Cola 2019, Apple 2019, and Walmart 2020). They are cut down to a few rows per statement
+but keep the layouts the parsers have to handle: two-row headers, footnotes, dashes, and negative numbers.
+
+The folder can also be any folder of saved Edgar files, for example one filing folder downloaded from
+https://www.sec.gov/Archives/edgar/data/<CIK>/<accession>/. Files are found in subfolders too.
+
+Examples:
+    python SECbenchmark.py
+    python SECbenchmark.py ~/Desktop/edgar_fixtures --repeat 20
+'''
+# import libraries
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    # no resource module on Windows, so only the memory python itself allocates is measured
+    resource = None
+    import tracemalloc
+
+# the url the summaries are parsed under (parse_reports() needs one to build the report urls)
+SUMMARY_URL = 'https://www.sec.gov/Archives/edgar/data/0/000000000000000000/FilingSummary.xml'
+
+# the corpus that is used when no folder is given
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def findCorpus(folder):
+    '''Returns the statement files and the FilingSummary files in the folder (and its subfolders).'''
+    statements = sorted(glob.glob(os.path.join(folder, '**', 'R*.htm'), recursive = True))
+    summaries = sorted(glob.glob(os.path.join(folder, '**', 'FilingSummary*.xml'), recursive = True))
+    return statements, summaries
+
+def _peakMemory():
+    '''The most memory the process has used so far, in bytes.'''
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1]
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _countRows(kind, output):
+    if kind == 'statements':
+        statement_data = output[0]
+        return len(statement_data['headers']) + len(statement_data['sections']) + len(statement_data['data'])
+    return len(output)
+
+def runBackend(kind, name, paths, repeat):
+    '''Parses every file repeat times with one backend. This is what runs in the separate process. Returns the
+    output of the first pass, the number of rows parsed per pass, the seconds per pass, and the extra memory.'''
+    import SECparse
+
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+
+    if kind == 'statements':
+        parse = lambda content: SECparse.parse_statement(content, name)
+    else:
+        parse = lambda content: SECparse.parse_reports(content, SUMMARY_URL, name)
+
+    if resource is None:
+        tracemalloc.start()
+    baseline = _peakMemory()
+
+    start = time.perf_counter()
+    outputs = [parse(content) for content in contents]
+    for n in range(repeat - 1):
+        for content in contents:
+            parse(content)
+    seconds = (time.perf_counter() - start) / repeat
+
+    memory = _peakMemory() - baseline
+    rows = sum(_countRows(kind, output) for output in outputs)
+    return outputs, rows, seconds, memory
+
+def benchmark(folder, repeat = 10, backends = None):
+    '''Runs every installed backend (or just the ones named in backends) over the folder. Returns a list of
+    dictionaries, one per backend and kind of file, with the results.'''
+    import SECparse
+
+    statements, summaries = findCorpus(folder)
+    corpus = [('statements', statements, SECparse.STATEMENT_PARSERS), ('summaries', summaries, SECparse.REPORT_PARSERS)]
+
+    # 'spawn' so every backend starts from a fresh process with nothing left over from the one before
+    context = multiprocessing.get_context('spawn')
+
+    results = []
+    for kind, paths, parsers in corpus:
+        if not paths:
+            continue
+        names = [name for name in parsers if backends is None or name in backends]
+
+        reference = None
+        for name in ['bs4'] + [name for name in names if name != 'bs4']:
+            with ProcessPoolExecutor(max_workers = 1, mp_context = context) as pool:
+                outputs, rows, seconds, memory = pool.submit(runBackend, kind, name, paths, repeat).result()
+
+            # the BeautifulSoup output is what every other backend has to match
+            if reference is None:
+                reference = outputs
+            if name not in names:
+                continue
+
+            mismatches = [os.path.basename(path) for path, a, b in zip(paths, reference, outputs) if a != b]
+            results.append({
+                'kind': kind,
+                'backend': name,
+                'files': len(paths),
+                'rows': rows,
+                'rowsPerSecond': rows / seconds if seconds else float('inf'),
+                'memory': memory,
+                'identical': not mismatches,
+                'mismatches': mismatches,
+            })
+    return results
+
+def printResults(results):
+    print('-' * 100)
+    print('{:<12}{:<12}{:>8}{:>10}{:>16}{:>14}  {}'.format('Files', 'Backend', 'Count', 'Rows', 'Rows/Second',
+                                                         'Peak Memory', 'Same Output'))
+    print('-' * 100)
+    for result in results:
+        print('{:<12}{:<12}{:>8}{:>10}{:>16,.0f}{:>11.1f} MB  {}'.format(
+            result['kind'], result['backend'], result['files'], result['rows'], result['rowsPerSecond'],
+            result['memory'] / 1024.0 / 1024.0, 'yes' if result['identical'] else 'NO'))
+        if result['mismatches']:
+            print('    different output for: ' + ', '.join(result['mismatches']))
+    print('-' * 100)
+
+    # the fastest backend that gives the right output, for each kind of file
+    for kind in ['statements', 'summaries']:
+        correct = [result for result in results if result['kind'] == kind and result['identical']]
+        if correct:
+            best = max(correct, key = lambda result: result['rowsPerSecond'])
+            print('Fastest correct backend for the ' + kind + ': ' + best['backend'])
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Compare the parser backends in SECparse.py.')
+    parser.add_argument('folder', nargs = '?', default = FIXTURES,
+                        help = 'folder of saved R*.htm and FilingSummary.xml files (default: the fixtures folder)')
+    parser.add_argument('--repeat', type = int, default = 10, help = 'how many times to parse every file')
+    parser.add_argument('--backend', action = 'append', dest = 'backends',
+                        help = 'only run this backend (can be given more than once)')
+    args = parser.parse_args()
+
+    results = benchmark(os.path.expanduser(args.folder), args.repeat, args.backends)
+    if not results:
+        print('No R*.htm or FilingSummary*.xml files in ' + args.folder)
+        return
+    printResults(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+'''
+Author: Marshall Jones
+Filename: SECbulk
+
+Description:
+SEC publishes the companyfacts json of every company in one zip file, updated every night:
+
+    https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip
+
+Instead of running 10kAnalysis once per company, ingest() loads the whole zip into one local table that
+every company can be read back out of (see companyFacts()). The zip is never extracted to disk: each
+worker process opens the zip once, reads one company's json straight out of it at a time, and flattens it
+into (cik, taxonomy, concept, unit, start, end, val, accn, fy, fp, form, filed) rows with iter_facts() from
+SECfacts.py. The main process writes the rows out in batches, to SQLite (a .sqlite or .db file) or Parquet (a
+.parquet file, if pyarrow is installed).
+
+Memory stays bounded no matter how big the zip is: only a few companies are handed to the workers at a time
+(maxPending), and the rows are written out as soon as batchRows of them have piled up.
+
+The output is written under a temporary name next to it (out + '.partial') and only renamed to out once
+everything has loaded, so a load that fails partway never leaves a half-written file (or replaces a good
+one from an earlier run).
+
+Example:
+    python SECbulk.py ~/Downloads/companyfacts.zip ~/sec_facts.sqlite --workers 4
+
+    facts = companyFacts('~/sec_facts.sqlite', 21344)
+    balSheet_df, income_df, cashFlow_df = facts.statements()
+'''
+# import libraries
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+from SECfacts import FACT_COLUMNS, CompanyFacts, iter_facts
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # no pyarrow, so the facts can only be written to SQLite
+    pyarrow = None
+
+COMPANYFACTS_ZIP_URL = 'https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip'
+
+# the columns of the table: the CIK of the company and then the columns of the fact table in SECfacts
+TABLE_COLUMNS = ['cik'] + FACT_COLUMNS
+
+
+def _partialPath(path):
+    '''The temporary file a writer loads into before it is renamed to path. A leftover one from a run that was
+    killed is thrown away.'''
+    partPath = path + '.partial'
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(partPath)
+    return partPath
+
+
+class SQLiteWriter(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.partPath = _partialPath(path)
+        self.connection = sqlite3.connect(self.partPath)
+        # nobody else reads the database while it is being loaded, so don't wait on the disk after every batch
+        self.connection.execute('PRAGMA synchronous = OFF')
+        self.connection.execute('PRAGMA journal_mode = MEMORY')
+        self.connection.execute('DROP TABLE IF EXISTS facts')
+        self.connection.execute('CREATE TABLE facts (cik INTEGER, taxonomy TEXT, concept TEXT, unit TEXT, start TEXT, '
+                                '"end" TEXT, val REAL, accn TEXT, fy INTEGER, fp TEXT, form TEXT, filed TEXT)')
+
+    def write(self, rows):
+        self.connection.executemany('INSERT INTO facts VALUES (' + ', '.join(['?'] * len(TABLE_COLUMNS)) + ')', rows)
+        self.connection.commit()
+
+    def close(self):
+        '''Finishes a load that went through: builds the index and puts the database in place.'''
+        # the index is built once at the end, which is much faster than keeping it up to date during the load
+        self.connection.execute('CREATE INDEX facts_cik_concept ON facts (cik, concept)')
+        self.connection.commit()
+        self.connection.close()
+        os.replace(self.partPath, self.path)
+
+    def abort(self):
+        '''Throws away a load that failed partway.'''
+        self.connection.rollback()
+        self.connection.close()
+        os.remove(self.partPath)
+
+
+class ParquetWriter(object):
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise ValueError("pyarrow isn't installed, so the facts can't be written to Parquet.")
+        self.schema = pyarrow.schema([
+            ('cik', pyarrow.int64()), ('taxonomy', pyarrow.string()), ('concept', pyarrow.string()),
+            ('unit', pyarrow.string()), ('start', pyarrow.string()), ('end', pyarrow.string()),
+            ('val', pyarrow.float64()), ('accn', pyarrow.string()), ('fy', pyarrow.int64()), ('fp', pyarrow.string()),
+            ('form', pyarrow.string()), ('filed', pyarrow.string()),
+        ])
+        self.path = path
+        self.partPath = _partialPath(path)
+        self.writer = pyarrow.parquet.ParquetWriter(self.partPath, self.schema)
+
+    def write(self, rows):
+        # every batch becomes one row group of the file
+        columns = list(zip(*rows))
+        arrays = {}
+        for n, name in enumerate(TABLE_COLUMNS):
+            values = columns[n]
+            if name == 'val':
+                values = [None if value is None else float(value) for value in values]
+            arrays[name] = values
+        self.writer.write_table(pyarrow.Table.from_pydict(arrays, schema = self.schema))
+
+    def close(self):
+        '''Finishes a load that went through and puts the file in place.'''
+        self.writer.close()
+        os.replace(self.partPath, self.path)
+
+    def abort(self):
+        '''Throws away a load that failed partway.'''
+        self.writer.close()
+        os.remove(self.partPath)
+
+
+def getWriter(path):
+    '''Picks the writer by the extension of the output file.'''
+    if path.lower().endswith('.parquet'):
+        return ParquetWriter(path)
+    return SQLiteWriter(path)
+
+
+# the zip each worker process reads from (opened once per process, see _openZip())
+_zip = None
+
+def _openZip(zipPath):
+    global _zip
+    _zip = zipfile.ZipFile(zipPath)
+
+def _flattenMember(name):
+    '''Reads one company's json out of the zip and returns its facts as rows. This runs in the worker processes.'''
+    with _zip.open(name) as f:
+        content = json.load(f)
+
+    try:
+        cik = int(content.get('cik') or os.path.basename(name)[3:13])
+    except ValueError:
+        return []
+    return [(cik,) + fact for fact in iter_facts(content)]
+
+def ingest(zipPath, outPath, workers = 4, batchRows = 200000, maxPending = None, limit = None):
+    '''Loads every company in the companyfacts.zip at zipPath into outPath (SQLite, or Parquet if it ends in
+    .parquet) using `workers` processes. At most maxPending companies (2 per worker by default) are being read
+    at once, and rows are written out every batchRows rows, which is what keeps the memory bounded. limit only
+    loads that many companies, for trying it out. Returns the number of companies and of facts loaded.'''
+    zipPath = os.path.expanduser(zipPath)
+    outPath = os.path.expanduser(outPath)
+    maxPending = maxPending or workers * 2
+
+    with zipfile.ZipFile(zipPath) as z:
+        names = [name for name in z.namelist() if name.lower().endswith('.json')]
+    if limit is not None:
+        names = names[:limit]
+
+    writer = getWriter(outPath)
+    batch = []
+    companies = 0
+    facts = 0
+    try:
+        with ProcessPoolExecutor(max_workers = workers, initializer = _openZip, initargs = (zipPath,)) as pool:
+            names = iter(names)
+            pending = set()
+            while True:
+                # keep the workers busy, but never have more than maxPending companies in memory
+                for name in names:
+                    pending.add(pool.submit(_flattenMember, name))
+                    if len(pending) >= maxPending:
+                        break
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                for future in done:
+                    rows = future.result()
+                    companies += 1
+                    facts += len(rows)
+                    batch.extend(rows)
+                    if len(batch) >= batchRows:
+                        writer.write(batch)
+                        batch = []
+
+        if batch:
+            writer.write(batch)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return companies, facts
+
+def companyFacts(path, CIK):
+    '''Reads one company's facts back out of a SQLite or Parquet file made by ingest() and returns them as a
+    CompanyFacts (see SECfacts.py), so statements() and the ratio analysis work the same as with the api.'''
+    path = os.path.expanduser(path)
+    if path.lower().endswith('.parquet'):
+        facts = pd.read_parquet(path, filters = [('cik', '=', int(CIK))])
+    else:
+        with sqlite3.connect(path) as connection:
+            facts = pd.read_sql_query('SELECT * FROM facts WHERE cik = ?', connection, params = (int(CIK),))
+    return CompanyFacts.fromColumns(int(CIK), None, facts[FACT_COLUMNS])
+
+def main():
+    parser = argparse.ArgumentParser(description = "Load SEC's bulk companyfacts.zip into SQLite or Parquet.")
+    parser.add_argument('zip', help = 'the companyfacts.zip (from ' + COMPANYFACTS_ZIP_URL + ')')
+    parser.add_argument('out', help = 'the file to write: .sqlite/.db for SQLite, .parquet for Parquet')
+    parser.add_argument('--workers', type = int, default = 4, help = 'how many processes read the zip')
+    parser.add_argument('--batch-rows', type = int, default = 200000, help = 'how many rows are written at a time')
+    parser.add_argument('--limit', type = int, help = 'only load this many companies')
+    args = parser.parse_args()
+
+    companies, facts = ingest(args.zip, args.out, args.workers, args.batch_rows, limit = args.limit)
+    print('Loaded ' + str(facts) + ' facts of ' + str(companies) + ' companies into ' + args.out)
+
+if __name__ == '__main__':
+    main()
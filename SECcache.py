@@ -0,0 +1,330 @@
+'''
+Author: Marshall Jones
+Filename: SECcache
+
+Description:
+Everything under https://www.sec.gov/Archives/edgar/data/<CIK>/<accession>/ (the index.json, the
+FilingSummary.xml, the R files, etc.) never changes once SEC publishes it. So there's no reason to ever
+download one of those files twice. The ArchiveCache keeps a copy of every one of them on disk, and the
+clients (SECclient.py and SECasync.py) check it before going to SEC. Since the files can't change, the
+cache never checks back with SEC to see if its copy is still good.
+
+The files are stored by the hash of their content, so two urls that return the same bytes only take up
+the space once. A small index file for each url points to the hash of its content:
+
+    <cacheDir>/archive/index/<sha256 of url>       -> contains the sha256 of the content
+    <cacheDir>/archive/objects/<ab>/<sha256 of content>
+
+Other pages, like the browse-edgar atom feed of a company's filings and the browse-edgar search page that
+getCIK reads, do change over time, so they get a second, separate tier: the RevalidatingCache. Each entry
+remembers when it was downloaded and the ETag/Last-Modified headers SEC sent with it. While the entry is
+younger than the time-to-live (TTL) of its endpoint it is used as is. After that, the client sends a
+conditional GET with If-None-Match/If-Modified-Since, and if SEC answers 304 Not Modified the old copy is
+used again without downloading the page.
+
+    <cacheDir>/mutable/<sha256 of url and params>.json  -> url, headers, time downloaded
+    <cacheDir>/mutable/<sha256 of url and params>.body
+
+The NoStatementsRecord remembers which filings turned out not to have financial statements (no
+FilingSummary.xml, or no 'Statements' category in it), so they are never downloaded again. It also learns,
+for each company, whether its amendments (10-K/A) come without statements, so the next time the amendments
+of that company can be skipped just by looking at their form type in the atom feed.
+
+    <cacheDir>/no_statements.json  -> {CIK: {'accessions': [...], 'amendments': true/false}}
+
+Finally, SingleFlight and AsyncSingleFlight are small in-memory layers for things that get asked for
+over and over during one run (like the filing list, which getFilingInfo, getCompanyInfo and the amendment
+retries all want). If the same request is already in flight, everyone waits on that one instead of
+sending their own, and the result (the parsed soup, not just the bytes) is kept for a few minutes.
+'''
+# import libraries
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import asyncio
+from urllib.parse import urlencode
+
+# where the cache lives unless the client is told otherwise
+CACHE_DIR = os.path.expanduser('~/.sec_edgar_cache')
+
+# anything inside of an accession folder in the archives is immutable
+ARCHIVE_RE = re.compile(r'^https?://www\.sec\.gov/Archives/edgar/data/\d+/\d{18}/', re.IGNORECASE)
+
+# how many seconds a copy of each changing endpoint is trusted before it is revalidated with SEC. The
+# first rule whose pattern matches the url (with its query string) wins; urls that match none of them
+# aren't cached at all.
+TTLS = [
+    # the atom feed of a company's filings (requestFilingListPage and getCompanyInfo)
+    (re.compile(r'^https?://www\.sec\.gov/cgi-bin/browse-edgar\?.*output=atom'), 60 * 60),
+    # the search page getCIK reads the CIK out of
+    (re.compile(r'^https?://www\.sec\.gov/cgi-bin/browse-edgar\?'), 24 * 60 * 60),
+    # the XBRL apis (see SECfacts.py), which change whenever the company files something new
+    (re.compile(r'^https?://data\.sec\.gov/api/xbrl/'), 24 * 60 * 60),
+]
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def _atomicWrite(path, data):
+    '''Writes the file under a temporary name and then renames it, so another process can never read a
+    half-written file.'''
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    fd, tmpPath = tempfile.mkstemp(dir = os.path.dirname(path), prefix = '.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmpPath, path)
+    except BaseException:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+        raise
+
+
+class ArchiveCache(object):
+
+    def __init__(self, cacheDir = CACHE_DIR):
+        self.root = os.path.join(cacheDir, 'archive')
+        self.indexDir = os.path.join(self.root, 'index')
+        self.objectDir = os.path.join(self.root, 'objects')
+
+    @staticmethod
+    def isImmutable(url):
+        '''True if the url points inside of an accession folder in the Edgar archives.'''
+        return ARCHIVE_RE.match(url) is not None
+
+    def _indexPath(self, url):
+        return os.path.join(self.indexDir, _sha256(url.encode('utf-8')))
+
+    def _objectPath(self, digest):
+        return os.path.join(self.objectDir, digest[:2], digest)
+
+    def get(self, url):
+        '''Returns the cached content of the url, or None if it hasn't been downloaded before.'''
+        try:
+            with open(self._indexPath(url), 'r') as f:
+                digest = f.read().strip()
+            with open(self._objectPath(digest), 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def put(self, url, content):
+        '''Stores the content of the url. If the same content is already stored (under any url), only the
+        index entry is written.'''
+        digest = _sha256(content)
+        objectPath = self._objectPath(digest)
+        if not os.path.exists(objectPath):
+            _atomicWrite(objectPath, content)
+        _atomicWrite(self._indexPath(url), digest.encode('ascii'))
+
+
+def cacheKey(url, params = None):
+    '''The url with its query parameters in a fixed order, so the same request always has the same key.'''
+    if not params:
+        return url
+    return url + ('&' if '?' in url else '?') + urlencode(sorted(params.items()))
+
+
+class RevalidatingCache(object):
+
+    def __init__(self, cacheDir = CACHE_DIR, ttls = TTLS):
+        self.root = os.path.join(cacheDir, 'mutable')
+        self.ttls = ttls
+
+    def ttlFor(self, key):
+        '''Returns the TTL in seconds of the endpoint, or None if the endpoint shouldn't be cached.'''
+        for pattern, ttl in self.ttls:
+            if pattern.match(key):
+                return ttl
+        return None
+
+    def _paths(self, key):
+        name = _sha256(key.encode('utf-8'))
+        return os.path.join(self.root, name + '.json'), os.path.join(self.root, name + '.body')
+
+    def get(self, key):
+        '''Returns the cached entry as a dictionary (url, etag, lastModified, fetched, content), or None if
+        there isn't one.'''
+        metaPath, bodyPath = self._paths(key)
+        try:
+            with open(metaPath, 'r') as f:
+                entry = json.load(f)
+            with open(bodyPath, 'rb') as f:
+                entry['content'] = f.read()
+        except (IOError, OSError, ValueError):
+            return None
+        return entry
+
+    def isFresh(self, key, entry):
+        '''True if the entry is younger than the TTL of its endpoint, so it can be used without asking SEC.'''
+        ttl = self.ttlFor(key)
+        return ttl is not None and time.time() - entry['fetched'] < ttl
+
+    def conditionalHeaders(self, entry):
+        '''The headers that turn the next request for this entry into a conditional GET.'''
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+        return headers
+
+    def put(self, key, content, headers):
+        '''Stores a fresh 200 response along with its validators.'''
+        metaPath, bodyPath = self._paths(key)
+        entry = {
+            'url': key,
+            'etag': headers.get('ETag'),
+            'lastModified': headers.get('Last-Modified'),
+            'fetched': time.time(),
+        }
+        _atomicWrite(bodyPath, content)
+        _atomicWrite(metaPath, json.dumps(entry).encode('utf-8'))
+
+    def touch(self, key, entry):
+        '''SEC said the entry hasn't changed (304), so restart its TTL.'''
+        metaPath = self._paths(key)[0]
+        entry = dict(entry)
+        entry.pop('content', None)
+        entry['fetched'] = time.time()
+        _atomicWrite(metaPath, json.dumps(entry).encode('utf-8'))
+
+
+class NoStatementsRecord(object):
+
+    def __init__(self, cacheDir = CACHE_DIR):
+        '''cacheDir is where the record is saved; set it to None to only keep it in memory.'''
+        self.path = os.path.join(cacheDir, 'no_statements.json') if cacheDir is not None else None
+        self._lock = threading.Lock()
+        self._companies = None
+
+    def _load(self):
+        '''Reads the saved record the first time it is needed. Has to be called while holding the lock.'''
+        if self._companies is None:
+            self._companies = {}
+            if self.path is not None:
+                try:
+                    with open(self.path, 'r') as f:
+                        self._companies = json.load(f)
+                except (IOError, OSError, ValueError):
+                    pass
+        return self._companies
+
+    def isUseless(self, CIK, filing, isAmendment = False):
+        '''True if the filing is already known not to have statements, or if it is an amendment and this
+        company's amendments have been found without statements before.'''
+        with self._lock:
+            company = self._load().get(str(CIK).lstrip('0'))
+        if company is None:
+            return False
+        return filing.accession in company['accessions'] or (isAmendment and company['amendments'])
+
+    def record(self, CIK, filing, isAmendment = False):
+        '''Remembers that the filing doesn't have statements, and if it is an amendment, that this company's
+        amendments don't.'''
+        with self._lock:
+            companies = self._load()
+            company = companies.setdefault(str(CIK).lstrip('0'), {'accessions': [], 'amendments': False})
+            if filing.accession not in company['accessions']:
+                company['accessions'].append(filing.accession)
+            company['amendments'] = company['amendments'] or isAmendment
+            if self.path is not None:
+                _atomicWrite(self.path, json.dumps(companies, sort_keys = True).encode('utf-8'))
+
+
+# the record shared by every function that isn't handed one explicitly
+_defaultRecord = None
+
+def getNoStatementsRecord():
+    '''Returns the shared NoStatementsRecord, creating it the first time it is needed.'''
+    global _defaultRecord
+    if _defaultRecord is None:
+        _defaultRecord = NoStatementsRecord()
+    return _defaultRecord
+
+
+class SingleFlight(object):
+
+    def __init__(self, ttl = 300):
+        '''ttl is how many seconds a finished result is handed out again before it is computed fresh.'''
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._results = {}
+        self._calls = {}
+
+    def _recent(self, key):
+        '''Returns (True, value) if there is a finished result for the key younger than the ttl. Has to be
+        called while holding the lock.'''
+        hit = self._results.get(key)
+        if hit is not None and time.time() - hit[0] < self.ttl:
+            return True, hit[1]
+        return False, None
+
+    def _remember(self, key, value):
+        '''Stores a finished result and drops the ones that have expired. Has to be called while holding the lock.'''
+        now = time.time()
+        for oldKey in [k for k, hit in self._results.items() if now - hit[0] >= self.ttl]:
+            del self._results[oldKey]
+        self._results[key] = (now, value)
+
+    def do(self, key, fn):
+        '''Returns fn() for the key. Only one thread at a time actually calls fn for a given key; any other
+        thread asking for the same key while it runs waits for that result (or its exception) instead.'''
+        with self._lock:
+            found, value = self._recent(key)
+            if found:
+                return value
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'event': threading.Event(), 'value': None, 'error': None}
+
+        if not leader:
+            call['event'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['value']
+
+        try:
+            call['value'] = fn()
+            return call['value']
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call['error'] is None:
+                    self._remember(key, call['value'])
+            call['event'].set()
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+class AsyncSingleFlight(SingleFlight):
+
+    async def do(self, key, coroFn):
+        '''Same as SingleFlight.do() but for coroutines on one event loop: coroFn() is only awaited once per
+        key, and everyone else awaits the same task.'''
+        found, value = self._recent(key)
+        if found:
+            return value
+
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(coroFn())
+            try:
+                value = await task
+                self._remember(key, value)
+                return value
+            finally:
+                del self._calls[key]
+
+        return await asyncio.shield(task)
@@ -0,0 +1,159 @@
+'''
+Author: Marshall Jones
+Filename: SECclient
+
+Description:
+Every request that goes to SEC Edgar (finding the CIK, pulling the filing list, the index.json,
+the FilingSummary.xml and each of the R files for the statements) goes through the EdgarClient
+in this module. Before this, each function called requests.get on its own, so every single request
+had to open a brand new connection to www.sec.gov (TCP + TLS handshake) before it could download
+anything. The client keeps one requests.Session with a pool of keep-alive connections so that the
+handshake is only paid once per connection and then reused for the rest of the run.
+
+SEC also asks that every automated request sends a User-Agent that says who is making it, with a real
+name and email address, and blocks the ones that don't. There is no default one: it comes from the userAgent
+argument or from the SEC_EDGAR_USER_AGENT environment variable, for example
+
+    export SEC_EDGAR_USER_AGENT="Jane Doe jane.doe@example.org"
+
+and the client sets that header once for the whole session.
+
+SEC only allows 10 requests per second, so before every request the client waits on a token bucket
+(see SECratelimit.py) that is shared by every thread and every worker process on the machine.
+
+Files inside of a filing's folder in the archives never change, so the client keeps them in an on-disk
+ArchiveCache (see SECcache.py) and never downloads the same one twice. Pages that do change (the
+browse-edgar search page and atom feeds) go through the RevalidatingCache instead, which reuses a copy
+until its TTL runs out and then asks SEC with a conditional GET whether it has changed.
+'''
+# import libraries
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from SECratelimit import getLimiter
+from SECcache import CACHE_DIR, ArchiveCache, RevalidatingCache, cacheKey
+
+# SEC wants a name and an email address in the User-Agent of automated requests. It is read from here when the
+# client isn't handed one.
+USER_AGENT_ENV = 'SEC_EDGAR_USER_AGENT'
+
+# number of keep-alive connections kept open per host
+POOL_SIZE = 10
+
+
+def getUserAgent(userAgent = None):
+    '''Returns the User-Agent to send: userAgent if it is given, otherwise the SEC_EDGAR_USER_AGENT environment
+    variable. Raises a ValueError if there isn't one, or if it doesn't have an email address in it, since SEC
+    blocks requests that don't say who is making them.'''
+    userAgent = (userAgent or os.environ.get(USER_AGENT_ENV) or '').strip()
+    if not userAgent:
+        raise ValueError('SEC requires a User-Agent with your name and email address. Set the ' + USER_AGENT_ENV +
+                         ' environment variable (like "Jane Doe jane.doe@example.org") or pass userAgent to the client.')
+    if '@' not in userAgent:
+        raise ValueError('The User-Agent "' + userAgent + '" has no email address in it. SEC requires your name and '
+                         'email address, like "Jane Doe jane.doe@example.org".')
+    return userAgent
+
+
+class EdgarClient(object):
+
+    def __init__(self, userAgent = None, poolSize = POOL_SIZE, timeout = 30, limiter = None, cacheDir = CACHE_DIR):
+        '''Builds the session that every request shares. userAgent is your name and email address (see
+        getUserAgent(); by default it comes from the SEC_EDGAR_USER_AGENT environment variable). poolSize is how
+        many connections can be kept open at the same time to one host (www.sec.gov), which only matters once
+        more than one request is in flight at a time. timeout is how many seconds to wait on SEC before giving
+        up on a request. limiter is the TokenBucket every request waits on; by default it's the shared one.
+        cacheDir is where the downloaded files are cached; set it to None to turn the cache off.'''
+        self.userAgent = getUserAgent(userAgent)
+        self.poolSize = poolSize
+        self.timeout = timeout
+        self.limiter = limiter or getLimiter()
+        self.archiveCache = ArchiveCache(cacheDir) if cacheDir is not None else None
+        self.mutableCache = RevalidatingCache(cacheDir) if cacheDir is not None else None
+
+        # mount an adapter with a bigger connection pool on both http and https
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = poolSize, pool_maxsize = poolSize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': self.userAgent,
+            'Accept-Encoding': 'gzip, deflate',
+        })
+
+    def get(self, url, params = None, **kwargs):
+        '''Same arguments and return value as requests.get, but the request goes out over one of the
+        pooled connections of the session. Files in the archives are served from the cache when they have
+        been downloaded before, without going to SEC at all.'''
+        if self.archiveCache is not None and params is None and self.archiveCache.isImmutable(url):
+            content = self.archiveCache.get(url)
+            if content is not None:
+                return cachedResponse(url, content)
+
+            response = self._send(url, params, **kwargs)
+            if response.status_code == 200:
+                self.archiveCache.put(url, response.content)
+            return response
+
+        if self.mutableCache is not None:
+            key = cacheKey(url, params)
+            if self.mutableCache.ttlFor(key) is not None:
+                return self._getRevalidated(key, url, params, **kwargs)
+
+        return self._send(url, params, **kwargs)
+
+    def _getRevalidated(self, key, url, params = None, **kwargs):
+        '''Serves a page that changes over time from the RevalidatingCache. A copy younger than its TTL is used
+        as is; an older one is revalidated with a conditional GET, and a 304 answer reuses the old copy.'''
+        entry = self.mutableCache.get(key)
+        if entry is not None:
+            if self.mutableCache.isFresh(key, entry):
+                return cachedResponse(key, entry['content'])
+            headers = dict(kwargs.pop('headers', None) or {})
+            headers.update(self.mutableCache.conditionalHeaders(entry))
+            kwargs['headers'] = headers
+
+        response = self._send(url, params, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.mutableCache.touch(key, entry)
+            return cachedResponse(key, entry['content'])
+        if response.status_code == 200:
+            self.mutableCache.put(key, response.content, response.headers)
+        return response
+
+    def _send(self, url, params = None, **kwargs):
+        '''Sends the request to SEC. It waits on the rate limiter first.'''
+        kwargs.setdefault('timeout', self.timeout)
+        self.limiter.acquire()
+        return self.session.get(url, params = params, **kwargs)
+
+    def close(self):
+        '''Closes all the pooled connections.'''
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def cachedResponse(url, content, status = 200):
+    '''Wraps content that came out of a cache in a requests.Response, so the functions that call get() can't
+    tell the difference.'''
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response._content = content
+    return response
+
+
+# the client shared by every function that isn't handed one explicitly
+_defaultClient = None
+
+def getClient():
+    '''Returns the shared EdgarClient, creating it the first time it is needed.'''
+    global _defaultClient
+    if _defaultClient is None:
+        _defaultClient = EdgarClient()
+    return _defaultClient
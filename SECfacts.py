@@ -0,0 +1,189 @@
+'''
+Author: Marshall Jones
+Filename: SECfacts
+
+Description:
+Every number a company has ever tagged in the XBRL of its filings is also published by SEC as one json
+file per company, the "companyfacts" api:
+
+    https://data.sec.gov/api/xbrl/companyfacts/CIK##########.json
+
+That one request covers every year the company has filed with XBRL, instead of the index.json,
+FilingSummary.xml and R files of each filing. The CompanyFacts class flattens the json into a fact table
+with one column per field (concept, unit, start, end, val, accn, fy, fp, form, filed) and one row per fact,
+and statements() turns the annual 10-K facts into balance sheet, income statement and cash flow dataframes
+with the same row names the analysis() function in 10kAnalysis looks for, so the same ratios can be
+computed from them.
+
+The values are in plain dollars, the same as the statement dataframes once their scale is applied (see
+apply_scale() in SECstatements.py). For testing, the source can be a local copy of the json, a folder of them,
+or a url with {} where the ten digit CIK goes (like a local stub server: 'http://localhost:8765/CIK{}.json').
+'''
+# import libraries
+import json
+import os
+import pandas as pd
+from SECclient import getClient
+
+COMPANYFACTS_URL = 'https://data.sec.gov/api/xbrl/companyfacts/CIK{}.json'
+
+# how many days long a fiscal year can be (52/53 week years included)
+YEAR_DAYS = (350, 380)
+
+# the rows of each statement that analysis() uses, and the us-gaap concepts each one can be found under,
+# in order of preference. Companies change concepts over the years (SalesRevenueNet became
+# RevenueFromContractWithCustomerExcludingAssessedTax in 2018), so every year uses the first concept that has it.
+INCOME_ROWS = [
+    ('Revenue', ['Revenues', 'RevenueFromContractWithCustomerExcludingAssessedTax',
+                 'RevenueFromContractWithCustomerIncludingAssessedTax', 'SalesRevenueNet', 'SalesRevenueGoodsNet']),
+    ('Cost of revenue', ['CostOfRevenue', 'CostOfGoodsAndServicesSold', 'CostOfGoodsSold', 'CostOfServices']),
+    ('Operating income', ['OperatingIncomeLoss']),
+    ('Interest expense', ['InterestExpense', 'InterestExpenseDebt']),
+    ('Provision for income taxes', ['IncomeTaxExpenseBenefit']),
+    ('Net income', ['NetIncomeLoss', 'ProfitLoss']),
+]
+CASH_FLOW_ROWS = [
+    ('Depreciation and amortization', ['DepreciationDepletionAndAmortization', 'DepreciationAndAmortization',
+                                       'DepreciationAmortizationAndAccretionNet', 'Depreciation']),
+]
+BALANCE_SHEET_ROWS = [
+    ('Cash and cash equivalents', ['CashAndCashEquivalentsAtCarryingValue',
+                                   'CashCashEquivalentsRestrictedCashAndRestrictedCashEquivalents']),
+    ('Marketable securities', ['MarketableSecuritiesCurrent', 'ShortTermInvestments',
+                               'AvailableForSaleSecuritiesDebtSecuritiesCurrent']),
+    ('Accounts receivable', ['AccountsReceivableNetCurrent', 'ReceivablesNetCurrent']),
+    ('Total current assets', ['AssetsCurrent']),
+    ('Total assets', ['Assets']),
+    ('Total current liabilities', ['LiabilitiesCurrent']),
+    ('Total liabilities', ['Liabilities']),
+    ('Total equity', ['StockholdersEquity', 'StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest']),
+    # plenty of filers (Coca-Cola is one) don't tag Liabilities at all, and analysis() then works total
+    # liabilities out from this row minus the equity
+    ('Total liabilities and equity', ['LiabilitiesAndStockholdersEquity']),
+]
+
+# the columns of the fact table
+FACT_COLUMNS = ['taxonomy', 'concept', 'unit', 'start', 'end', 'val', 'accn', 'fy', 'fp', 'form', 'filed']
+
+
+def iter_facts(content):
+    '''Goes through the decoded companyfacts json of one company and yields every fact as a tuple in the order
+    of FACT_COLUMNS.'''
+    for taxonomy, concepts in content.get('facts', {}).items():
+        for concept, info in concepts.items():
+            for unit, facts in info.get('units', {}).items():
+                for fact in facts:
+                    yield (taxonomy, concept, unit, fact.get('start'), fact.get('end'), fact.get('val'), fact.get('accn'),
+                           fact.get('fy'), fact.get('fp'), fact.get('form'), fact.get('filed'))
+
+
+class CompanyFacts(object):
+
+    def __init__(self, CIK, name, facts):
+        '''facts is the fact table (see fromJSON()).'''
+        self.CIK = CIK
+        self.name = name
+        self.facts = facts
+
+    @classmethod
+    def fromJSON(cls, content):
+        '''Flattens the companyfacts json (bytes, text, or already decoded) into the fact table. The table is built
+        one column at a time out of plain lists, which is a lot faster than building a row for every fact.'''
+        if isinstance(content, (bytes, str)):
+            content = json.loads(content)
+
+        columns = dict((column, []) for column in FACT_COLUMNS)
+        for row in iter_facts(content):
+            for column, value in zip(FACT_COLUMNS, row):
+                columns[column].append(value)
+        return cls.fromColumns(content.get('cik', ''), content.get('entityName'), columns)
+
+    @classmethod
+    def fromColumns(cls, CIK, name, columns):
+        '''Builds the CompanyFacts out of a dictionary of column name to list of values (or a dataframe) with
+        the FACT_COLUMNS in it, for example facts that were already loaded into a database (see SECbulk.py).'''
+        facts = pd.DataFrame(columns, columns = FACT_COLUMNS)
+        for column in ['start', 'end', 'filed']:
+            facts[column] = pd.to_datetime(facts[column])
+        for column in ['taxonomy', 'concept', 'unit', 'fp', 'form']:
+            facts[column] = facts[column].astype('category')
+        return cls(str(CIK), name, facts)
+
+    def __len__(self):
+        return len(self.facts)
+
+    def annual(self, unit = 'USD', instant = False):
+        '''The facts reported in 10-K's for a whole fiscal year (or, if instant is True, at the end of one, like
+        everything on the balance sheet), with one value per concept and period: the one filed last, so a
+        number that was later restated shows up restated. Returns a dataframe with the concepts as rows and
+        the period end dates as columns.'''
+        facts = self.facts
+        annual = facts[(facts['unit'] == unit) & facts['form'].isin(['10-K', '10-K/A'])]
+        if instant:
+            annual = annual[annual['start'].isna()]
+        else:
+            days = (annual['end'] - annual['start']).dt.days
+            annual = annual[(days >= YEAR_DAYS[0]) & (days <= YEAR_DAYS[1])]
+
+        annual = annual.sort_values('filed').drop_duplicates(['concept', 'end'], keep = 'last')
+        return annual.pivot(index = 'concept', columns = 'end', values = 'val')
+
+    def statement(self, rows, years, instant = False, asOf = None):
+        '''Builds one statement dataframe: a row for each (name, concepts) pair in rows, and a column for each of
+        the most recent years (most recent first, like the statement files), or the most recent years up to
+        asOf ('YYYY-MM-DD'). Each value comes from the first concept in the list that has one for that year.'''
+        annual = self.annual(instant = instant)
+        statement_df = pd.DataFrame(index = [name for name, concepts in rows], columns = annual.columns, dtype = float)
+        for name, concepts in rows:
+            for concept in reversed(concepts):
+                if concept in annual.index:
+                    values = annual.loc[concept]
+                    statement_df.loc[name] = values.where(values.notna(), statement_df.loc[name])
+
+        ends = sorted([end for end in statement_df.columns if statement_df[end].notna().any() and
+                       (asOf is None or end <= pd.Timestamp(asOf))], reverse = True)[:years]
+        # rows the company doesn't report at all are left out, so analysis() treats them as missing like it
+        # does for the statement files
+        statement_df = statement_df[ends].dropna(how = 'all')
+
+        # the columns are the period end dates, the same as the statement dataframes (see period_columns() in
+        # SECstatements.py)
+        statement_df.columns = pd.DatetimeIndex(ends, name = 'Period End')
+        statement_df.index.name = 'Category'
+        return statement_df
+
+    def statements(self, years = 3, asOf = None):
+        '''Returns balSheet_df, income_df and cashFlow_df, ready for analysis() in 10kAnalysis. The balance sheet
+        has the two most recent year ends (the statement file only has two), the other two have `years` years.'''
+        balSheet_df = self.statement(BALANCE_SHEET_ROWS, min(years, 2), instant = True, asOf = asOf)
+        income_df = self.statement(INCOME_ROWS, years, asOf = asOf)
+        cashFlow_df = self.statement(CASH_FLOW_ROWS, years, asOf = asOf)
+        return balSheet_df, income_df, cashFlow_df
+
+    def latestFiled(self, asOf = None):
+        '''The date ('YYYY-MM-DD') the most recent 10-K (or 10-K/A, the same forms annual() reads) in the facts was
+        filed. Returns None if there isn't one, or none filed on or before asOf.'''
+        filed = self.facts.loc[self.facts['form'].isin(['10-K', '10-K/A']), 'filed'].dropna()
+        if asOf is not None:
+            filed = filed[filed <= pd.Timestamp(asOf)]
+        if filed.empty:
+            return None
+        return filed.max().strftime('%Y-%m-%d')
+
+
+def getCompanyFacts(CIK, client = None, source = COMPANYFACTS_URL):
+    '''Downloads the company's facts and returns them as a CompanyFacts. source is the url of the api with {}
+    where the ten digit CIK goes, or a local stand-in for it: a json file, or a folder of CIK##########.json
+    files.'''
+    paddedCIK = str(CIK).lstrip('0').zfill(10)
+
+    if os.path.isdir(source):
+        source = os.path.join(source, 'CIK' + paddedCIK + '.json')
+    if os.path.isfile(source):
+        with open(source, 'rb') as f:
+            return CompanyFacts.fromJSON(f.read())
+
+    client = client or getClient()
+    response = client.get(source.format(paddedCIK))
+    response.raise_for_status()
+    return CompanyFacts.fromJSON(response.content)
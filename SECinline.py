@@ -0,0 +1,183 @@
+'''
+Author: Marshall Jones
+Filename: SECinline
+
+Description:
+Since 2019 the primary document of a 10-K (the big .htm file) is inline XBRL: every number in it is wrapped
+in an <ix:nonFraction> tag that says which us-gaap concept it is, which period it is for (its contextRef),
+what unit it is in, and how the displayed text turns into the actual value:
+
+    <ix:nonFraction name="us-gaap:Revenues" contextRef="FY2019" unitRef="usd" decimals="-6" scale="6"
+                    format="ixt:num-dot-decimal">37,266</ix:nonFraction>
+
+extract_inline_facts() reads those tags straight out of the document, so the values don't have to be
+cleaned out of display strings like '$ (4,704)' by the make_*_df functions. The document is streamed with
+lxml.etree.iterparse and every element is thrown away as soon as it has been read (unless it is part of a
+fact or a context that is still being read), so a 50MB+ document takes about as much memory as a small one.
+The contexts (the periods) are usually at the top of the document in the ix:header, but the facts are only
+tied to their periods at the end, so the order doesn't matter.
+
+The fact table has the same columns as the one in SECfacts.py, so inlineCompanyFacts() can hand it to
+CompanyFacts and get the same statements() for the ratio analysis.
+'''
+# import libraries
+import io
+import os
+import pandas as pd
+import lxml.etree
+from SECclient import getClient
+from SECfacts import FACT_COLUMNS, CompanyFacts
+
+IX_NS = '{http://www.xbrl.org/2013/inlineXBRL}'
+XBRLI_NS = '{http://www.xbrl.org/2003/instance}'
+XSI_NIL = '{http://www.w3.org/2001/XMLSchema-instance}nil'
+
+NON_FRACTION = IX_NS + 'nonFraction'
+CONTEXT = XBRLI_NS + 'context'
+UNIT = XBRLI_NS + 'unit'
+READ_TAGS = (NON_FRACTION, CONTEXT, UNIT)
+
+# the extra columns of the inline fact table, on top of FACT_COLUMNS
+INLINE_COLUMNS = FACT_COLUMNS + ['contextRef', 'decimals', 'dimensions']
+
+# the texts that mean zero when a fact is formatted as ixt:fixed-zero or ixt:zerodash
+ZERO_TEXTS = set(['-', '–', '—', ''])
+
+# the formats that write the number with a decimal comma, like 1.234,5
+COMMA_DECIMAL_FORMATS = set(['numcommadecimal', 'num-comma-decimal'])
+
+
+def parse_inline_value(text, format = None, scale = None, sign = None):
+    '''Turns the displayed text of an ix:nonFraction into its value: '37,266' with scale 6 becomes 37266000000.
+    The format says how the digits are written (1,234.5 or 1.234,5, or a dash for zero), the scale is the
+    power of ten the text is in (6 for millions), and a sign of '-' makes it negative (the text itself never
+    has the minus sign, the parentheses around negative numbers are outside of the tag).'''
+    format = (format or '').lower().split(':')[-1]
+    text = text.replace('\xa0', '').replace(' ', '').strip()
+
+    if 'zero' in format or text in ZERO_TEXTS:
+        value = 0.0
+    elif format in COMMA_DECIMAL_FORMATS:
+        value = float(text.replace('.', '').replace(',', '.'))
+    else:
+        value = float(text.replace(',', ''))
+
+    if scale:
+        value = value * 10 ** int(scale)
+    if sign == '-':
+        value = -value
+    return value
+
+def _read_context(context):
+    '''Returns (start, end, dimensions) of an xbrli:context element. An instant has no start. dimensions is True
+    if the context has a segment (like one business segment or one class of stock), which the totals on the
+    statements don't have.'''
+    instant = context.findtext('.//' + XBRLI_NS + 'instant')
+    if instant is not None:
+        start, end = None, instant.strip()
+    else:
+        start = (context.findtext('.//' + XBRLI_NS + 'startDate') or '').strip() or None
+        end = (context.findtext('.//' + XBRLI_NS + 'endDate') or '').strip() or None
+    dimensions = context.find('.//' + XBRLI_NS + 'segment') is not None or \
+                 context.find('.//' + XBRLI_NS + 'scenario') is not None
+    return start, end, dimensions
+
+def _read_unit(unit):
+    '''Returns the name of an xbrli:unit the way the companyfacts api writes it: 'USD' for iso4217:USD, and
+    'USD/shares' for a divide (like earnings per share). The unitRef ids themselves are made up by whoever
+    wrote the document ('U_USD', 'usd', ...).'''
+    def measures(element):
+        return '*'.join(measure.text.strip().split(':')[-1] for measure in element.iter(XBRLI_NS + 'measure'))
+
+    numerator = unit.find('.//' + XBRLI_NS + 'unitNumerator')
+    denominator = unit.find('.//' + XBRLI_NS + 'unitDenominator')
+    if numerator is not None and denominator is not None:
+        return measures(numerator) + '/' + measures(denominator)
+    return measures(unit)
+
+def iter_inline_elements(source):
+    '''Streams the document and yields every ix:nonFraction, xbrli:context and xbrli:unit element once it has
+    been read completely. Everything else is cleared out of memory as soon as it ends.'''
+    keep = 0
+    for event, element in lxml.etree.iterparse(source, events = ('start', 'end'), huge_tree = True,
+                                               remove_comments = True, recover = True):
+        tag = element.tag
+        if event == 'start':
+            if tag in READ_TAGS:
+                keep += 1
+            continue
+
+        if tag in READ_TAGS:
+            keep -= 1
+            yield element
+
+        # don't clear anything inside of a fact or a context that hasn't ended yet
+        if keep == 0:
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+def extract_inline_facts(source, accn = None, form = '10-K', filed = None):
+    '''Reads every ix:nonFraction fact out of an inline XBRL document. source is the path of the document, a
+    file object, or its content as bytes. accn, form and filed are filled in for every fact (the document
+    doesn't say them), the same as in the companyfacts api. Returns the fact table as a dataframe with the
+    INLINE_COLUMNS: the FACT_COLUMNS plus contextRef, decimals, and dimensions. Facts that show up more
+    than once in the document (on different pages) are only kept once.'''
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    contexts = {}
+    units = {}
+    facts = []
+    for element in iter_inline_elements(source):
+        if element.tag == CONTEXT:
+            contexts[element.get('id')] = _read_context(element)
+            continue
+        if element.tag == UNIT:
+            units[element.get('id')] = _read_unit(element)
+            continue
+
+        name = element.get('name', '')
+        taxonomy, concept = name.split(':', 1) if ':' in name else ('', name)
+        if element.get(XSI_NIL) == 'true':
+            value = None
+        else:
+            try:
+                value = parse_inline_value(''.join(element.itertext()), element.get('format'), element.get('scale'),
+                                           element.get('sign'))
+            except ValueError:
+                value = None
+        facts.append((taxonomy, concept, element.get('unitRef'), value, element.get('contextRef'), element.get('decimals')))
+
+    # now that every context and unit has been read, tie each fact to its period and unit
+    columns = dict((column, []) for column in INLINE_COLUMNS)
+    for taxonomy, concept, unit, value, contextRef, decimals in facts:
+        start, end, dimensions = contexts.get(contextRef, (None, None, False))
+        row = {'taxonomy': taxonomy, 'concept': concept, 'unit': units.get(unit, unit), 'start': start, 'end': end,
+               'val': value, 'accn': accn, 'fy': None, 'fp': 'FY' if form and form.startswith('10-K') else None,
+               'form': form, 'filed': filed, 'contextRef': contextRef, 'decimals': decimals, 'dimensions': dimensions}
+        for column in INLINE_COLUMNS:
+            columns[column].append(row[column])
+
+    table = pd.DataFrame(columns, columns = INLINE_COLUMNS)
+    return table.drop_duplicates(['taxonomy', 'concept', 'contextRef', 'unit']).reset_index(drop = True)
+
+def inlineCompanyFacts(source, CIK = '', accn = None, form = '10-K', filed = None):
+    '''Reads the facts out of one inline XBRL document (see extract_inline_facts()) and returns the ones without
+    dimensions (the company-wide totals) as a CompanyFacts, so statements() and the ratio analysis can use
+    them just like the companyfacts api.'''
+    table = extract_inline_facts(source, accn, form, filed)
+    table = table[~table['dimensions']]
+    return CompanyFacts.fromColumns(CIK, None, table[FACT_COLUMNS])
+
+def getInlineFacts(url, client = None, accn = None, form = '10-K', filed = None):
+    '''Downloads an inline XBRL document (like the primary .htm of a 10-K in the Edgar archives, which the
+    client caches on disk) and returns its fact table.'''
+    if os.path.exists(url):
+        return extract_inline_facts(url, accn, form, filed)
+    client = client or getClient()
+    response = client.get(url)
+    response.raise_for_status()
+    return extract_inline_facts(response.content, accn, form, filed)
@@ -0,0 +1,914 @@
+'''
+Author: Marshall Jones
+Filename: SECparse
+
+Description:
+These are the parts of 10kAnalysis that read the pages SEC Edgar sends back, pulled out into their own
+module so they don't care how the page was downloaded. 10kAnalysis downloads the pages one at a time
+with the EdgarClient, and SECasync downloads them on an asyncio event loop, but both of them hand the
+content to the same functions here, so the two versions can never parse a filing differently.
+
+The statement files (R2.htm, etc.) and the FilingSummary.xml can each be parsed by more than one parser
+backend: BeautifulSoup (always there), lxml, and selectolax (each one only if it is installed). They all give
+the same output; they only differ in speed and memory. parse_statement() and parse_reports() use the fastest
+one that is installed unless they are told which one to use, and SECbenchmark.py compares them.
+
+Most filings with a FilingSummary.xml also have a Financial_Report.xlsx with every R file in it as a worksheet
+(R1.htm is the first sheet, R2.htm the second, and so on). parse_financial_report() reads the statements out
+of that one workbook into the same statements_data structure.
+
+iter_submission_documents() splits the complete submission text file (<accession>.txt) back into the
+documents it is made of while it is still being downloaded.
+'''
+# import libraries
+import io
+import re
+from collections import namedtuple
+from bs4 import BeautifulSoup, UnicodeDammit
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:
+    # no lxml, so the files are parsed with BeautifulSoup (slower, but the same output)
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        # older versions of selectolax only have the modest parser
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+CIK_RE = re.compile(r'.*CIK=(\d{10}).*')
+
+# base url for every file in the Edgar archives
+BASE_URL = r"https://www.sec.gov/"
+
+
+def parse_cik(text, ticker):
+    '''Finds the CIK of the ticker in the browse-edgar search page. It creates a list of CIK's in the variable
+    'results' but the elements are all the same.'''
+    cik_dict = {}
+    results = CIK_RE.findall(text)
+
+    if len(results):
+        results[0] = int(re.sub(r'\.[0]*', '.', results[0]))
+        cik_dict[str(ticker).upper()] = str(results[0])
+
+    CIK = cik_dict[ticker]
+    return CIK
+
+def make_filing_list_soup(content):
+    '''Turns the atom feed of a company's filing list into something the program can read through and parse.'''
+    return BeautifulSoup(content, 'xml')
+
+def parse_filing_entries(soup):
+    '''Searches through the soup to find all 'entries,' or recordings of financial reports. Each entry
+    has a different accession number. So, the function loops through each entry to append each accession number
+    to a list of acc numbers. The 0 element in this list is the most recently published report.'''
+    # find all the accession number entry tags
+    entries = soup.find_all('entry')
+
+    # initialize lists for storage
+    masterListXML = []
+    ACClist = []
+
+    # loop through each entry
+    for entry in entries:
+
+        # grab the accession number to create a key value
+        accession_num = entry.find('accession-number').text #don't know why, but SEC misspelled "number" here
+        ACClist.append(accession_num)
+
+        #Don't really need this dictionary, but it will likely be useful at some point.
+        entry_dict = {}
+        entry_dict[accession_num] = {}
+
+        # store the file info
+        entry_dict[accession_num]['filing_date'] = entry.find('filing-date').text
+        entry_dict[accession_num]['filing_href'] = entry.find('filing-href').text
+        entry_dict[accession_num]['filing_type'] = entry.find('filing-type').text
+
+        # store in the master list
+        masterListXML.append(entry_dict)
+
+    return ACClist, masterListXML
+
+# one filing out of a company's filing list. date is the filing date as 'YYYY-MM-DD', so the dates sort
+# correctly as plain strings.
+Filing = namedtuple('Filing', ['accession', 'date', 'type', 'href'])
+
+
+class FilingList(object):
+    '''A company's filing list, parsed once into compact Filing records (newest first) so the program can step
+    through older filings without downloading and parsing the atom feed again. It can be indexed like a
+    list, sliced by position or by date range, and filtered by filing type:
+
+        filings[0]                                  the most recent filing
+        filings.between('2015-01-01', '2019-12-31') the filings published in those years
+        filings.ofType('10-K')                      the filings that aren't amendments'''
+
+    def __init__(self, filings = ()):
+        self.filings = list(filings)
+
+    @classmethod
+    def fromSoup(cls, soup):
+        '''Builds the list out of an atom feed soup.'''
+        return cls.fromEntries(zip(*parse_filing_entries(soup)))
+
+    @classmethod
+    def fromEntries(cls, entries):
+        '''Builds the list out of (accession number, entry_dict) pairs, like the ones parse_filing_entries()
+        returns or iterFilingEntries() yields. The entry_dict can be the whole {accession: info} dictionary
+        or just the info.'''
+        filings = []
+        for ACC, info in entries:
+            info = info.get(ACC, info)
+            filings.append(Filing(ACC, info['filing_date'], info['filing_type'], info['filing_href']))
+        return cls(filings)
+
+    def __len__(self):
+        return len(self.filings)
+
+    def __iter__(self):
+        return iter(self.filings)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return FilingList(self.filings[i])
+        return self.filings[i]
+
+    def between(self, start = None, end = None):
+        '''The filings published from start to end (both 'YYYY-MM-DD', both included). Leaving either one out
+        leaves that side open.'''
+        return FilingList(f for f in self.filings
+                          if (start is None or f.date >= start) and (end is None or f.date <= end))
+
+    def ofType(self, *types):
+        '''The filings of the given types, for example ofType('10-K') or ofType('10-K', '10-K405').'''
+        types = set(t.upper() for t in types)
+        return FilingList(f for f in self.filings if f.type.upper() in types)
+
+    def accessions(self):
+        return [f.accession for f in self.filings]
+
+    def __repr__(self):
+        return 'FilingList(' + repr(self.filings) + ')'
+
+def is_amendment(formType):
+    '''True if the form type is an amendment, like 10-K/A. The atom feed already says what form every filing
+    is, so amendments can be told apart without downloading anything out of them.'''
+    return str(formType).strip().upper().endswith('/A')
+
+def pick_candidates(filings, counter, candidates, skip):
+    '''Goes down the filing list from position counter and returns the next `candidates` filings that skip()
+    doesn't rule out, as (position in the list, filing) pairs. Filings that are skipped don't count toward
+    the number of candidates.'''
+    picked = []
+    for n in range(counter, len(filings)):
+        if len(picked) >= candidates:
+            break
+        if not skip(filings[n]):
+            picked.append((n, filings[n]))
+    return picked
+
+def candidate_stages(picked):
+    '''Splits the candidates from pick_candidates() into the groups they are checked in: the newest one on its
+    own, then the next 2, then the next 4, and so on. Nearly always the newest filing has statements, and then
+    it is the only one downloaded. When it doesn't (like after a string of amendments), the next ones are
+    checked a few at a time instead of one round of requests each.'''
+    size = 1
+    while picked:
+        yield picked[:size]
+        picked = picked[size:]
+        size *= 2
+
+def has_next_page(soup):
+    '''True if the atom feed has a <link rel="next"> to another page of filings.'''
+    return soup.find('link', {'rel':'next'}) is not None
+
+def parse_company_info(soup, ticker):
+    '''Gathers the company info out of the filing list soup: business and mailing addresses, its Standard
+    Industrial Classification (SIC) information, the company's official name, its CIK, and its fyscal year end.'''
+    # find all the accession number entry tags
+    info = soup.find('company-info')
+
+    # loop through each entry
+    for item in info:
+
+        info_dict = {}
+
+        # store the addresses info (mailing and business)
+        info_dict['addresses'] = {}
+
+        info_dict['addresses']['mailing'] = {}
+        info_dict['addresses']['mailing']['city'] = info.find('city').text
+        info_dict['addresses']['mailing']['state'] = info.find('state').text
+        info_dict['addresses']['mailing']['street1'] = info.find('street1').text
+        if info.find('street2') is not None:
+            info_dict['addresses']['mailing']['street2'] = info.find('street2').text
+        info_dict['addresses']['mailing']['zip'] = info.find('zip').text
+
+        info_dict['addresses']['business'] = {}
+        info_dict['addresses']['business']['city'] = info.find('city').text
+        info_dict['addresses']['business']['phone'] = info.find('phone').text
+        info_dict['addresses']['business']['state'] = info.find('state').text
+        info_dict['addresses']['business']['street1'] = info.find('street1').text
+        if info.find('street2') is not None:
+            info_dict['addresses']['business']['street2'] = info.find('street2').text
+        info_dict['addresses']['business']['zip'] = info.find('zip').text
+
+        # store the company's Standard Industrial Classification (SIC) info
+        info_dict['sicInfo'] = {}
+        info_dict['sicInfo']['SIC'] = info.find('assigned-sic').text
+        info_dict['sicInfo']['SIC Description'] = info.find('assigned-sic-desc').text
+        info_dict['sicInfo']['SIC URL'] = info.find('assigned-sic-href').text
+
+        # store name info
+        info_dict['nameInfo'] = {}
+        info_dict['nameInfo']['Name'] = info.find('conformed-name').text
+        '''can add code to also append former names to the dictionary if needed'''
+
+        # store other company info
+        info_dict['CIK'] = info.find('cik').text
+        info_dict['ticker'] = ticker
+        info_dict['FYE'] = info.find('fiscal-year-end').text
+
+    return info_dict
+
+def submission_url(CIK, ACC):
+    '''The url of the complete submission text file of the filing (every document in the filing, one after
+    another, in one .txt file).'''
+    return BASE_URL + "Archives/edgar/data/" + CIK + "/" + ACC + ".txt"
+
+def filing_index_url(CIK, ACC):
+    '''Converts the CIK and accession number into the url of the filing's index.json (the document landing page).'''
+    normal_url = submission_url(CIK, ACC)
+    return normal_url.replace('-','').replace('.txt','/index.json')
+
+def find_filing_summary(content):
+    '''Looks through the decoded index.json of a filing for the FilingSummary.xml and returns its url, or None
+    if the filing doesn't have one.'''
+    xml_summary = None
+    for file in content['directory']['item']:
+
+        # Grab the filing summary and create a new url leading to the file so we can download it.
+        if file['name'] == 'FilingSummary.xml':
+            xml_summary = BASE_URL + content['directory']['name'] + "/" + file['name']
+
+    return xml_summary
+
+def find_primary_document(content, xml_summary):
+    '''Looks through the FilingSummary.xml content for the primary document of the filing (the 10-K .htm itself,
+    which is inline XBRL since 2019) and returns its url, or None if the summary doesn't list one. The input
+    files are listed at the end of the summary, and the primary one is the only one with a doctype, like
+    <File doctype="10-K" original="ko-20191231.htm">ko-20191231.htm</File>.'''
+    soup = BeautifulSoup(content, 'lxml')
+    for file in soup.find_all('file'):
+        if file.get('doctype') and file.text.strip().lower().endswith('.htm'):
+            return xml_summary.replace('FilingSummary.xml', file.text.strip())
+    return None
+
+def parse_reports_bs4(content, xml_summary):
+    '''Parses the FilingSummary.xml content into the master_reports list. Each report has a short name, long
+    name, position, category, and url.'''
+    # If we need to download the reports, we can define a new url that represents the filing folder:
+    filingFolderURL = xml_summary.replace('FilingSummary.xml', '')
+
+    soup = BeautifulSoup(content, 'lxml')
+
+    # find the 'myreports' tag because this contains all the individual reports submitted.
+    reports = soup.find('myreports')
+
+    # I want a list to store all the individual components of the report, so create the master list.
+    master_reports = []
+
+    # loop through each report in the 'myreports' tag. The last one is usually 'All Reports', which isn't a
+    # report of its own and has no file (or category), so any report without a file is skipped.
+    for report in reports.find_all('report'):
+        if report.htmlfilename is None:
+            continue
+
+        # let's create a dictionary to store all the different parts we need.
+        report_dict = {}
+        report_dict['name_short'] = report.shortname.text
+        report_dict['name_long'] = report.longname.text
+        report_dict['position'] = report.position.text
+        report_dict['category'] = report.menucategory.text
+        report_dict['url'] = filingFolderURL + report.htmlfilename.text
+
+        # append the dictionary to the master list.
+        master_reports.append(report_dict)
+
+    return master_reports
+
+# the words grab_financial_statements() looks for in the short names of the four primary statements
+PRIMARY_STATEMENTS = [
+    ('Balance', 'BALANCE'),
+    ('Operations', 'OPERATIONS', 'Income', 'INCOME'),
+    ('Cash', 'CASH'),
+    ('Equity', 'EQUITY'),
+]
+
+def iter_reports(content, xml_summary):
+    '''Streaming version of parse_reports_bs4(): reads the FilingSummary.xml with lxml.etree.iterparse and
+    yields each report_dict as soon as its </Report> tag has been read, instead of building a tree of the
+    whole file first. Every report is cleared out of memory once it has been yielded, so a filing with
+    hundreds of detail reports never has more than one of them in memory. If the caller stops asking
+    for reports (see until_primary_statements()), the rest of the file is never parsed at all.'''
+    filingFolderURL = xml_summary.replace('FilingSummary.xml', '')
+
+    for event, report in lxml.etree.iterparse(io.BytesIO(content), events = ('end',), tag = 'Report'):
+        fileName = report.findtext('HtmlFileName')
+
+        # 'All Reports' (usually the last one) has no file of its own, so it is skipped
+        if fileName is not None:
+            yield {
+                'name_short': report.findtext('ShortName', ''),
+                'name_long': report.findtext('LongName', ''),
+                'position': report.findtext('Position', ''),
+                'category': report.findtext('MenuCategory', ''),
+                'url': filingFolderURL + fileName,
+            }
+
+        # free the report, and the ones before it, now that we're done with them
+        report.clear()
+        while report.getprevious() is not None:
+            del report.getparent()[0]
+
+def until_primary_statements(reports):
+    '''Passes the reports through until the first report for each of the four primary statements (balance
+    sheet, income statement, cash flows, and equity) has gone by, along with at least one report in the
+    'Statements' category, and then stops. grab_financial_statements() always picks the first match for each
+    statement, and has_statements() only needs one 'Statements' report, so they give the same answer for
+    the shorter list as they would for the whole summary.'''
+    found = [False] * len(PRIMARY_STATEMENTS)
+    statements = False
+    for report_dict in reports:
+        yield report_dict
+
+        for n, words in enumerate(PRIMARY_STATEMENTS):
+            if not found[n] and any(word in report_dict['name_short'] for word in words):
+                found[n] = True
+        statements = statements or report_dict['category'] == 'Statements'
+        if statements and all(found):
+            return
+
+def parse_reports_lxml(content, xml_summary):
+    '''Same as parse_reports_bs4(), using the streaming iter_reports().'''
+    return list(iter_reports(content, xml_summary))
+
+def parse_reports_selectolax(content, xml_summary):
+    '''Same as parse_reports_bs4(), using selectolax. It is an HTML parser, so like BeautifulSoup's 'lxml'
+    parser it lowercases the tag names.'''
+    filingFolderURL = xml_summary.replace('FilingSummary.xml', '')
+    reports = HTMLParser(content).css_first('myreports')
+
+    master_reports = []
+    for report in reports.css('report'):
+        if report.css_first('htmlfilename') is None:
+            continue
+        master_reports.append({
+            'name_short': report.css_first('shortname').text(),
+            'name_long': report.css_first('longname').text(),
+            'position': report.css_first('position').text(),
+            'category': report.css_first('menucategory').text(),
+            'url': filingFolderURL + report.css_first('htmlfilename').text(),
+        })
+    return master_reports
+
+def has_statements(master_reports):
+    '''Checks that the 'Statements' category is in the summary. If not, the filing is probably an amendment.'''
+    catList = []
+    for x in master_reports:
+        catList.append(x['category'])
+    return 'Statements' in catList
+
+def grab_financial_statements(master_reports):
+    '''Now that we have a master_reports list with multiple dictionaries (report_dict), we can find the financial
+    statements that we want and put their URL's into a list. First, we define the statements that we want from the
+    master_reports list.
+
+    It is very common for a company to list their financial statements in different orders, so it is very important
+    to record the order in which the statement URL's are listed. For this reason, we create the reportOrder
+    dictionary. This order is very important in the next functions.
+
+    The function then returns the list of URL's for each statement, as well as the reportOrder dictionary.'''
+    # create the list to hold the statement urls
+    statements_url = []
+
+    item1 = None
+    item2 = None
+    item3 = None
+    item4 = None
+
+    # define the statements we want to look for (defined as item1 - item4)
+    # consider changing master_reports to all caps if errors keep popping up and to decrease lines of code
+    for v in master_reports:
+        # BALANCE SHEET
+        if "Balance" in v['name_short']:
+            item1 = r"" + v['name_short']
+            break
+        elif "BALANCE" in v['name_short']:
+            item1 = r"" + v['name_short']
+            break
+
+    for v in master_reports:
+        # INCOME STATEMENT
+        if "Operations" in v['name_short']:
+            item2 = r"" + v['name_short']
+            break
+        if "OPERATIONS" in v['name_short']:
+            item2 = r"" + v['name_short']
+            break
+        elif "Income" in v['name_short']:
+            item2 = r"" + v['name_short']
+            break
+        elif "INCOME" in v['name_short']:
+            item2 = r"" + v['name_short']
+            break
+
+    for v in master_reports:
+        # STATEMENT OF CASH FLOWS
+        if "Cash" in v['name_short']:
+            item3 = r"" + v['name_short']
+            break
+        elif "CASH" in v['name_short']:
+            item3 = r"" + v['name_short']
+            break
+
+    for v in master_reports:
+        # STATEMENT OF STOCKHOLDERS EQUITY
+        if "Equity" in v['name_short']:
+            item4 = r"" + v['name_short']
+            break
+        elif "EQUITY" in v['name_short']:
+            item4 = r"" + v['name_short']
+            break
+    '''print("item1: ",item1)
+    print("item2: ",item2)
+    print("item3: ",item3)
+    print("item4: ",item4)'''
+
+    # store the statement names in a list
+    report_list = [item1, item2, item3, item4]
+    reportOrder = {}
+    n = 0
+    #create a list with all the keys below in the desired order instead of iteration for report order
+    for reportDict in master_reports:
+
+        # if the short name can be found in the report list.
+        if reportDict['name_short'] in report_list:
+
+            # record index position of financial statement
+            if "Balance" in reportDict['name_short']:
+                reportOrder['Balance Sheet'] = n
+            elif "BALANCE" in reportDict['name_short']:
+                reportOrder['Balance Sheet'] = n
+            elif "Operations" in reportDict['name_short']:
+                reportOrder['Income Statement'] = n
+            elif "OPERATIONS" in reportDict['name_short']:
+                reportOrder['Income Statement'] = n
+            elif "Income" in reportDict['name_short']:
+                reportOrder['Income Statement'] = n
+            elif "INCOME" in reportDict['name_short']:
+                reportOrder['Income Statement'] = n
+            elif "Cash" in reportDict['name_short']:
+                reportOrder['Statement of Cash Flows'] = n
+            elif "CASH" in reportDict['name_short']:
+                reportOrder['Statement of Cash Flows'] = n
+            elif "Equity" in reportDict['name_short']:
+                reportOrder["Statement of Stockholders' Equity"] = n
+            elif "EQUITY" in reportDict['name_short']:
+                reportOrder["Statement of Stockholders' Equity"] = n
+            n += 1
+
+            # print some info and store it in the statements url.
+            print('-'*100)
+            print(reportDict['name_short'])
+            print(reportDict['url'])
+                
+            statements_url.append(reportDict['url'])
+        
+    #print("Report List:\n",report_list)
+    #print("\nReport Order Dictionary:\n"+str(reportOrder))
+    return statements_url, reportOrder
+
+def parse_statement_bs4(content):
+    '''Takes the raw content of one statement file (R2.htm, R4.htm, etc.) and sorts each row of its table into
+    headers, sections, or data. It returns the statement_data dictionary for that statement, as well as a
+    dictionary that counts how many rows of data come before each section header. Next to the headers,
+    statement_data['headerSpans'] has the (colspan, rowspan) of every header cell, which is what it takes to
+    tell which columns a '12 Months Ended' or 'Common Stock' header is over.'''
+    # define a dictionary that will store the different parts of the statement.
+    statement_data = {}
+    statement_data['headers'] = []
+    statement_data['headerSpans'] = []
+    statement_data['sections'] = []
+    statement_data['data'] = []
+
+    # count the rows of data under each section
+    sectionRows = {}
+    dataRows = 0
+
+    # the parser is named, not left for BeautifulSoup to guess, so this output (which SECbenchmark.py holds every
+    # other backend to) doesn't change with whichever parsers happen to be installed
+    report_soup = BeautifulSoup(content, 'lxml')
+
+    # find all the rows, figure out what type of row it is, parse the elements, and store in the statement file list.
+    for index, row in enumerate(report_soup.table.find_all('tr')):
+
+        # first let's get all the elements.
+        cols = row.find_all('td')
+
+        # if it's a regular row and not a section or a table header
+        if (len(row.find_all('th')) == 0 and len(row.find_all('strong')) == 0):
+            reg_row = [ele.text.strip() for ele in cols]
+            statement_data['data'].append(reg_row)
+            dataRows += 1
+
+        # if it's a regular row and a section but not a table header
+        elif (len(row.find_all('th')) == 0 and len(row.find_all('strong')) != 0):
+            sec_row = cols[0].text.strip()
+            statement_data['sections'].append(sec_row)
+
+            sectionRows[sec_row] = dataRows
+            dataRows = 0
+
+        # finally if it's not any of those it must be a header
+        elif (len(row.find_all('th')) != 0):
+            hed_row = [ele.text.strip() for ele in row.find_all('th')]
+            statement_data['headers'].append(hed_row)
+            statement_data['headerSpans'].append([_spans(ele.get) for ele in row.find_all('th')])
+
+        else:
+            print('We encountered an error.')
+
+    return statement_data, sectionRows
+
+def _spans(get):
+    '''The (colspan, rowspan) of a header cell, from the get() of its attributes. A missing or broken one is 1,
+    the same as a browser takes it.'''
+    spans = []
+    for name in ('colspan', 'rowspan'):
+        value = (get(name) or '').strip()
+        spans.append(int(value) if value.isdigit() and int(value) > 0 else 1)
+    return tuple(spans)
+
+def _decode(content):
+    '''Decodes the bytes of a statement file the same way BeautifulSoup does. The other parsers guess
+    differently (lxml assumes latin-1 when the file doesn't say), which would change characters like the
+    em dash SEC uses for empty cells.'''
+    if isinstance(content, bytes):
+        return UnicodeDammit(content, is_html = True).unicode_markup
+    return content
+
+def parse_statement_lxml(content):
+    '''Same as parse_statement_bs4(), with the same output, but built straight on lxml. BeautifulSoup builds a
+    whole tree of its own objects for every R file and then searches each row for th's and strong's up to
+    three times. Here the document is parsed by lxml alone, and each row is walked just once: that one walk
+    collects its td's and th's and notices if there is a strong in it, which is all it takes to tell what
+    kind of row it is.'''
+    statement_data = {}
+    statement_data['headers'] = []
+    statement_data['headerSpans'] = []
+    statement_data['sections'] = []
+    statement_data['data'] = []
+
+    sectionRows = {}
+    dataRows = 0
+
+    content = _decode(content)
+
+    # like report_soup.table, this is the first table in the document, and its rows include the rows of
+    # any tables nested inside of it
+    table = lxml.html.document_fromstring(content).find('.//table')
+
+    for row in table.iter('tr'):
+        cols = []
+        heads = []
+        strong = False
+        for ele in row.iter('td', 'th', 'strong'):
+            tag = ele.tag
+            if tag == 'td':
+                cols.append(ele)
+            elif tag == 'th':
+                heads.append(ele)
+            else:
+                strong = True
+
+        # a header row
+        if heads:
+            statement_data['headers'].append([ele.text_content().strip() for ele in heads])
+            statement_data['headerSpans'].append([_spans(ele.get) for ele in heads])
+
+        # a section row
+        elif strong:
+            sec_row = cols[0].text_content().strip()
+            statement_data['sections'].append(sec_row)
+            sectionRows[sec_row] = dataRows
+            dataRows = 0
+
+        # a regular row of data
+        else:
+            statement_data['data'].append([ele.text_content().strip() for ele in cols])
+            dataRows += 1
+
+    return statement_data, sectionRows
+
+def parse_statement_selectolax(content):
+    '''Same as parse_statement_bs4(), with the same output, using selectolax (a wrapper around the lexbor
+    HTML parser written in C).'''
+    statement_data = {}
+    statement_data['headers'] = []
+    statement_data['headerSpans'] = []
+    statement_data['sections'] = []
+    statement_data['data'] = []
+
+    sectionRows = {}
+    dataRows = 0
+
+    table = HTMLParser(_decode(content)).css_first('table')
+
+    for row in table.css('tr'):
+        heads = row.css('th')
+
+        # a header row
+        if heads:
+            statement_data['headers'].append([ele.text().strip() for ele in heads])
+            statement_data['headerSpans'].append([_spans(ele.attributes.get) for ele in heads])
+
+        # a section row
+        elif row.css_first('strong') is not None:
+            sec_row = row.css('td')[0].text().strip()
+            statement_data['sections'].append(sec_row)
+            sectionRows[sec_row] = dataRows
+            dataRows = 0
+
+        # a regular row of data
+        else:
+            statement_data['data'].append([ele.text().strip() for ele in row.css('td')])
+            dataRows += 1
+
+    return statement_data, sectionRows
+
+
+# every parser backend that is installed
+STATEMENT_PARSERS = {'bs4': parse_statement_bs4}
+REPORT_PARSERS = {'bs4': parse_reports_bs4}
+if lxml is not None:
+    STATEMENT_PARSERS['lxml'] = parse_statement_lxml
+    REPORT_PARSERS['lxml'] = parse_reports_lxml
+if HTMLParser is not None:
+    STATEMENT_PARSERS['selectolax'] = parse_statement_selectolax
+    REPORT_PARSERS['selectolax'] = parse_reports_selectolax
+
+# the backend used when none is asked for
+DEFAULT_PARSER = 'lxml' if lxml is not None else 'bs4'
+
+def _backend(parsers, parser):
+    '''Looks up the parser backend by name (the default one if parser is None).'''
+    parser = parser or DEFAULT_PARSER
+    if parser not in parsers:
+        raise ValueError("The '" + str(parser) + "' parser isn't installed. Choose one of: " + ', '.join(parsers))
+    return parsers[parser]
+
+def parse_reports(content, xml_summary, parser = None, stopEarly = False):
+    '''Parses the FilingSummary.xml content into the master_reports list (see parse_reports_bs4()) with the
+    parser backend named by parser ('bs4', 'lxml' or 'selectolax').
+
+    If stopEarly is True, the list ends once the four primary statements have been found (see
+    until_primary_statements()). With the lxml backend the summary is streamed, so the rest of the file
+    isn't even parsed.'''
+    if (parser or DEFAULT_PARSER) == 'lxml' and lxml is not None:
+        reports = iter_reports(content, xml_summary)
+    else:
+        reports = _backend(REPORT_PARSERS, parser)(content, xml_summary)
+
+    if stopEarly:
+        reports = until_primary_statements(reports)
+    return list(reports)
+
+def parse_statement(content, parser = None):
+    '''Parses one statement file with the parser backend named by parser ('bs4', 'lxml' or 'selectolax').
+    Returns statement_data and sectionRows (see parse_statement_bs4()).'''
+    return _backend(STATEMENT_PARSERS, parser)(content)
+
+
+# the number of the report in its file name, for example 2 for R2.htm
+REPORT_NUMBER_RE = re.compile(r'R(\d+)\.htm$', re.IGNORECASE)
+
+def financial_report_url(statements_url):
+    '''The url of the Financial_Report.xlsx in the same filing folder as the statement files.'''
+    return statements_url[0].rsplit('/', 1)[0] + '/Financial_Report.xlsx'
+
+def _cell_text(cell):
+    '''Writes the value of a worksheet cell the way the R files write it: '$ 6,480' for a number with a currency
+    format, '(4,704)' for a negative number, and '' for an empty cell.'''
+    value = getattr(cell, 'value', None)
+    if value is None:
+        return ''
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        if hasattr(value, 'strftime'):
+            return value.strftime('%b. %d, %Y')
+        return ' '.join(str(value).split())
+
+    if float(value).is_integer():
+        text = '{:,}'.format(abs(int(value)))
+    else:
+        text = '{:,}'.format(abs(value))
+    if value < 0:
+        text = '(' + text + ')'
+    if '$' in (getattr(cell, 'number_format', None) or ''):
+        text = '$ ' + text
+    return text
+
+def parse_worksheet(sheet):
+    '''Sorts the rows of one worksheet into headers, sections, and data, like parse_statement_bs4() does for the
+    rows of an R file. The header rows are the first row (the title) and the rows right after it that have
+    nothing in the first column (the dates under a "12 Months Ended" row). Empty cells in the header rows are
+    left out, just like the cells a colspan covers in the R file, and the spans are worked out from them (see
+    _worksheet_spans()). After that, a row whose label is bold is a section, and every other row is data.'''
+    statement_data = {}
+    statement_data['headers'] = []
+    statement_data['headerSpans'] = []
+    statement_data['sections'] = []
+    statement_data['data'] = []
+
+    sectionRows = {}
+    dataRows = 0
+    inHeader = True
+    headerRows = []
+
+    for row in sheet.iter_rows():
+        cols = [_cell_text(cell) for cell in row]
+        if not any(cols):
+            continue
+
+        # a header row
+        if inHeader and (not statement_data['headers'] or cols[0] == ''):
+            statement_data['headers'].append([col for col in cols if col != ''])
+            headerRows.append(cols)
+            continue
+        inHeader = False
+
+        # a section row
+        font = getattr(row[0], 'font', None)
+        if font is not None and font.b:
+            statement_data['sections'].append(cols[0])
+            sectionRows[cols[0]] = dataRows
+            dataRows = 0
+
+        # a regular row of data
+        else:
+            statement_data['data'].append(cols)
+            dataRows += 1
+
+    statement_data['headerSpans'] = _worksheet_spans(headerRows)
+    return statement_data, sectionRows
+
+def _worksheet_spans(rows):
+    '''The (colspan, rowspan) of every non-empty cell of the header rows of a worksheet, like the R file has
+    them. The workbook is read in read_only mode, which doesn't have the merged cells, but a merged cell is
+    just empty cells after the first one: a cell spans down over the empty cells under it, and then right over
+    the empty cells next to it that a cell above doesn't already cover.'''
+    width = max([len(row) for row in rows] or [0])
+    rows = [list(row) + [''] * (width - len(row)) for row in rows]
+    covered = set()
+    spans = []
+    for r, row in enumerate(rows):
+        rowSpans = []
+        for c, text in enumerate(row):
+            if text == '':
+                continue
+            colspan = 1
+            while c + colspan < width and row[c + colspan] == '' and (r, c + colspan) not in covered:
+                colspan += 1
+            rowspan = 1
+            while r + rowspan < len(rows) and all(rows[r + rowspan][c + n] == '' for n in range(colspan)):
+                rowspan += 1
+            covered.update((r + down, c + n) for down in range(1, rowspan) for n in range(colspan))
+            rowSpans.append((colspan, rowspan))
+        spans.append(rowSpans)
+    return spans
+
+def parse_financial_report(content, statements_url):
+    '''Reads the statements out of the Financial_Report.xlsx content with openpyxl in read_only mode, so the rows
+    are streamed out of the file instead of loading the whole workbook. Returns a (statement_data, sectionRows)
+    pair for each url in statements_url, in the same order. Raises a ValueError if a url isn't an R*.htm
+    file or the workbook doesn't have a sheet for it.'''
+    if load_workbook is None:
+        raise ValueError("openpyxl isn't installed.")
+
+    workbook = load_workbook(io.BytesIO(content), read_only = True, data_only = True)
+    try:
+        sheets = workbook.worksheets
+        results = []
+        for url in statements_url:
+            match = REPORT_NUMBER_RE.search(url)
+            if match is None or not 0 < int(match.group(1)) <= len(sheets):
+                raise ValueError("Financial_Report.xlsx doesn't have a sheet for " + url)
+            results.append(parse_worksheet(sheets[int(match.group(1)) - 1]))
+        return results
+    finally:
+        workbook.close()
+
+
+# one document out of the complete submission text file
+SubmissionDocument = namedtuple('SubmissionDocument', ['filename', 'type', 'content'])
+
+# the statement files of a filing: R2.htm, R4.htm, etc. (R2.xml, etc. in older filings)
+REPORT_FILE_RE = re.compile(r'^R\d+\.(htm|xml)$', re.IGNORECASE)
+
+def is_statement_document(filename, docType):
+    '''True for the FilingSummary.xml and the R files, the only documents the statements are read out of.'''
+    return filename == 'FilingSummary.xml' or REPORT_FILE_RE.match(filename) is not None
+
+def _unwrap(content):
+    '''The submission wraps xml documents in <XML> ... </XML> (and some in <XBRL>), so those are taken off.'''
+    content = content.strip()
+    for tag in (b'XML', b'XBRL'):
+        if content[:len(tag) + 2].upper() == b'<' + tag + b'>' and content[-(len(tag) + 3):].upper() == b'</' + tag + b'>':
+            content = content[len(tag) + 2:-(len(tag) + 3)].strip()
+    return content
+
+def iter_submission_documents(chunks, keep = is_statement_document):
+    '''Splits the complete submission text file into its documents as the bytes arrive. chunks is any
+    iterable of bytes (like response.iter_content() of a streamed request). The file is SGML that looks like:
+
+        <DOCUMENT>
+        <TYPE>XML
+        <SEQUENCE>42
+        <FILENAME>FilingSummary.xml
+        <TEXT>
+        ... the document ...
+        </TEXT>
+        </DOCUMENT>
+
+    For every document that keep(filename, type) says to keep, a SubmissionDocument is yielded as soon as
+    its </TEXT> has arrived. The text of every other document is thrown away as it goes by, and so is the
+    text of any uuencoded document (pictures, pdf's, zip files), which starts with a "begin 644 <name>" line
+    and is never decoded. So the memory used is about the size of the largest document that is kept, not
+    the size of the whole submission.'''
+    buffer = b''
+    state = 'outside'
+    info = {}
+    parts = None
+
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            # between documents and in the lines before <TEXT>, the file is read one line at a time
+            if state == 'outside' or state == 'header':
+                end = buffer.find(b'\n')
+                if end < 0:
+                    break
+                line = buffer[:end].strip()
+                buffer = buffer[end + 1:]
+
+                if state == 'outside':
+                    if line == b'<DOCUMENT>':
+                        state = 'header'
+                        info = {}
+                elif line == b'<TEXT>':
+                    state = 'start'
+                    parts = [] if keep(info.get('FILENAME', ''), info.get('TYPE', '')) else None
+                elif line.startswith(b'<') and b'>' in line:
+                    tag, value = line[1:].split(b'>', 1)
+                    info[tag.decode('ascii', 'replace')] = value.strip().decode('utf-8', 'replace')
+
+            # the start of the text says whether it is uuencoded
+            elif state == 'start':
+                buffer = buffer.lstrip()
+                if len(buffer) < len(b'begin '):
+                    break
+                if buffer.startswith(b'begin '):
+                    parts = None
+                state = 'text'
+
+            # the text itself is searched for </TEXT> instead of being split into lines
+            else:
+                end = buffer.find(b'</TEXT>')
+                if end < 0:
+                    # hold on to just enough of the end to catch a </TEXT> cut in half between two chunks
+                    cut = len(buffer) - (len(b'</TEXT>') - 1)
+                    if cut > 0:
+                        if parts is not None:
+                            parts.append(buffer[:cut])
+                        buffer = buffer[cut:]
+                    break
+
+                if parts is not None:
+                    parts.append(buffer[:end])
+                    yield SubmissionDocument(info.get('FILENAME', ''), info.get('TYPE', ''), _unwrap(b''.join(parts)))
+                buffer = buffer[end + len(b'</TEXT>'):]
+                parts = None
+                state = 'outside'
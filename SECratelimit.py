@@ -0,0 +1,127 @@
+'''
+Author: Marshall Jones
+Filename: SECratelimit
+
+Description:
+SEC's fair access rules allow at most 10 requests per second from one user. Up until now the only thing
+keeping the program under that limit was the fact that it did everything one request at a time. The
+TokenBucket in this module is what the EdgarClient (see SECclient.py) waits on before every request.
+
+The bucket fills up with tokens at a steady rate (10 per second by default) and every request takes one
+token out. If the bucket is empty, the request waits until the next token drips in. The state of the bucket
+(how many tokens are left and when it was last filled) is protected by a lock so that every thread shares
+the same bucket. When a lockPath is given, the state is kept in that file instead and guarded with an
+exclusive file lock, so separate worker processes on the same machine also share one bucket.
+'''
+# import libraries
+import asyncio
+import os
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # no file locks on this platform (Windows), so the bucket can only be shared between threads.
+    fcntl = None
+
+# SEC's limit is 10 requests per second
+SEC_RATE = 10
+
+# the file that worker processes share the bucket through
+LOCK_PATH = os.path.join(tempfile.gettempdir(), 'sec_edgar_ratelimit.lock')
+
+# the bucket state is stored as two doubles: tokens left and the time they were counted
+_STATE = struct.Struct('dd')
+
+
+class TokenBucket(object):
+
+    def __init__(self, rate = SEC_RATE, capacity = 1, lockPath = None):
+        '''rate is the number of tokens added to the bucket per second. capacity is how many tokens the
+        bucket can hold, which is the largest burst of requests that can go out at once. With the default
+        capacity of 1 the requests are spaced out evenly (one every 1/rate seconds), so no one-second window
+        can ever contain more than rate requests.
+
+        If lockPath is given (and the platform has file locks), the bucket lives in that file and is shared
+        by every process that opens it with the same path.'''
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.lockPath = lockPath if fcntl is not None else None
+        self._lock = threading.Lock()
+
+        # in-memory state, only used when the bucket isn't shared through a file
+        self._tokens = self.capacity
+        self._stamp = time.time()
+
+    def _take(self, tokens, state):
+        '''Refills the bucket for the time that has passed since the last stamp and tries to take the tokens.
+        Returns the new state and how long to wait (0 if the tokens were taken).'''
+        level, stamp = state
+        now = time.time()
+        level = min(self.capacity, level + max(0.0, now - stamp) * self.rate)
+        if level >= tokens:
+            return (level - tokens, now), 0.0
+        return (level, now), (tokens - level) / self.rate
+
+    def _takeShared(self, tokens):
+        '''Same as _take() but the state is read from and written back to the lock file while holding an
+        exclusive lock on it.'''
+        fd = os.open(self.lockPath, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, _STATE.size, 0)
+            if len(raw) == _STATE.size:
+                state = _STATE.unpack(raw)
+            else:
+                # brand new file, so start with a full bucket
+                state = (self.capacity, time.time())
+            state, wait = self._take(tokens, state)
+            os.pwrite(fd, _STATE.pack(*state), 0)
+            return wait
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _tryTake(self, tokens):
+        '''Tries once to take the tokens from whichever bucket this is (in memory or shared through the file).
+        Returns how long to wait before trying again, or 0 if the tokens were taken.'''
+        with self._lock:
+            if self.lockPath is not None:
+                return self._takeShared(tokens)
+            (self._tokens, self._stamp), wait = self._take(tokens, (self._tokens, self._stamp))
+            return wait
+
+    def acquire(self, tokens = 1):
+        '''Blocks until the tokens are available and takes them out of the bucket. The sleeping is done
+        outside of the locks so that other threads and processes can keep checking the bucket.'''
+        while True:
+            wait = self._tryTake(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquireAsync(self, tokens = 1):
+        '''Same as acquire() but for code running on an asyncio event loop. Taking the tokens blocks on the
+        thread lock (and on the file lock, when the bucket is shared with other processes), so it is done on a
+        worker thread, and waiting is done with asyncio.sleep, so the rest of the loop keeps running while this
+        request waits for its token.'''
+        while True:
+            wait = await asyncio.to_thread(self._tryTake, tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+# the bucket shared by every client that isn't handed one explicitly
+_defaultLimiter = None
+
+def getLimiter():
+    '''Returns the shared TokenBucket, creating it the first time it is needed. It is shared between
+    processes through LOCK_PATH.'''
+    global _defaultLimiter
+    if _defaultLimiter is None:
+        _defaultLimiter = TokenBucket(lockPath = LOCK_PATH)
+    return _defaultLimiter
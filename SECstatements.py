@@ -0,0 +1,420 @@
+'''
+Author: Marshall Jones
+Filename: SECstatements
+
+Description:
+make_statement_dfs() in 10kAnalysis turns the statements_data that SECparse.py reads out of the statement
+files (R2.htm, etc.) into pandas dataframes. The work is done here, so the balance sheet, the income statement,
+the cash flow statement and the statement of stockholders' equity are all built the same way.
+
+The cells of a statement file are display strings, not numbers: '$ 6,480', '(4,704)' for a negative number,
+'—' for zero, '' for nothing, '$ 2.09 [1]' with a footnote marker, or '21.0%'. to_numbers() turns all of them
+into a float64 numpy array at once with one compiled regular expression (through pandas' vectorized string
+methods), instead of three DataFrame.replace passes over every cell and then astype(float), which broke on the
+dashes, the footnote markers and the percents. Anything that isn't a number (like the text of a footnote)
+becomes NaN.
+
+Footnotes come with the statement file too: a marker like [1] in a cell or a row label, and the text of the
+footnote in the last rows of the table (a blank row, then '[1]Calculated based on net income.'). split_footnotes()
+finds every marker with one regex scan over the whole table, cuts the footnote rows off the bottom with one
+slice, and hands the footnotes back as a dictionary of Footnote's for that statement.
+
+The numbers in a statement file are shown in thousands or millions, and the title cell says which, like
+'CONSOLIDATED STATEMENTS OF INCOME - USD ($) shares in Millions, $ in Millions' or 'USD ($) In Thousands, except
+Per Share data'. parse_statement_scale() reads the unit and the scales out of the title, and apply_scale() turns
+the statement into plain dollars (and plain share counts) with one multiply, so statements of different
+companies (and the XBRL facts in SECfacts.py) are all in the same units. Per share numbers aren't scaled.
+
+The column headers of the balance sheet, income statement and cash flow statement are the periods, written like
+'Dec. 31, 2019' (with '12 Months Ended' in the header row above) or '12 Months Ended Sep. 28, 2019'.
+header_stacks() lines the header rows up with the columns using the colspans and rowspans of their cells, and
+statement_columns() turns them into a DatetimeIndex of the period end dates, so the columns sort, line up
+between statements and filings, and can be looked up by date (or, when a statement has two periods that end on
+the same day, a MultiIndex of the end date and the number of months). parse_period_header() is cached, because
+every filing repeats the same few headers.
+
+build_statements() puts all of that together for every statement of a filing at once: each statement's rows go
+into a dataframe and lose their footnotes, then the cells of all the statements are converted with a single
+to_numbers() call, and each statement gets its scale and its period columns.
+'''
+# import libraries
+import functools
+import re
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# one number the way the statement files write it: an optional currency sign, parentheses or a minus sign
+# for negative numbers, thousands separators, a percent sign, and any number of footnote markers after it
+NUMBER_RE = re.compile(r'''^\s*
+    [$€£¥]?\s*
+    (?P<open>\()?\s*
+    [$€£¥]?\s*
+    (?P<minus>[-−])?\s*
+    (?P<number>\d[\d,]*(?:\.\d*)?|\.\d+)\s*
+    %?\s*
+    \)?\s*
+    %?\s*
+    (?:\[\d+\]\s*)*
+    $''', re.VERBOSE)
+
+# the statement files write a zero as a dash
+DASH_RE = re.compile(r'^\s*[$]?\s*[-–—−]\s*(?:\[\d+\]\s*)*$')
+
+# a footnote marker, a cell that is nothing but markers, and the start of a footnote row's label ('[1]Calculated
+# based on...', or '[1]Includes restricted cash.[2]Restated.' when several footnotes share a row)
+FOOTNOTE_MARKER_RE = re.compile(r'\[(\d+)\]')
+MARKERS_ONLY_RE = re.compile(r'^\s*(?:\[\d+\]\s*)+$')
+FOOTNOTE_ROW_RE = re.compile(r'^\s*\[\d+\]')
+
+# one footnote of a statement: its number, its text (None if the statement file didn't have it), and the
+# (row label, column) of every cell it is attached to. The column is None when the marker is on the row label.
+# build_statements() gives the column as the statement's column header (the period end date when the headers
+# are dates); split_footnotes() on its own gives the column of the raw dataframe.
+Footnote = namedtuple('Footnote', ['number', 'text', 'positions'])
+
+# how much the numbers of a statement are shown in
+SCALES = {'thousands': 1e3, 'millions': 1e6, 'billions': 1e9}
+
+# 'USD ($)' in the title, '$ in Millions' / 'shares in Millions' / 'In Thousands', and 'except Share data'
+UNIT_RE = re.compile(r'\b([A-Z]{3}) \(')
+SCALE_RE = re.compile(r'([$€£¥]|shares|share data)?\s*\bin (thousands|millions|billions)\b', re.IGNORECASE)
+EXCEPT_SHARES_RE = re.compile(r'except (?:share|shares)\b(?! per)', re.IGNORECASE)
+
+# the rows that are per share (not scaled) and the rows that are a number of shares (scaled like shares). The
+# statement files add the unit of every row that isn't money to its label, '(in dollars per share)' (or '(in USD
+# per share)') and '(in shares)', so only that is looked at: the rest of the label ('Cash dividends declared
+# ($2.12 per share)', 'Preferred stock, no par value, 5,000 shares authorized') can talk about shares and still
+# be a dollar amount
+PER_SHARE_RE = re.compile(r'\(in [^()]+ per share\)', re.IGNORECASE)
+SHARE_ROW_RE = re.compile(r'\(in shares\)', re.IGNORECASE)
+
+# the unit of a statement ('USD', or None if the title doesn't say), what the dollar amounts are shown in, and
+# what the numbers of shares are shown in (1.0 is as they are)
+StatementScale = namedtuple('StatementScale', ['unit', 'money', 'shares'])
+
+# 'Dec. 31, 2019', 'Sept. 28, 2019' or '12 Months Ended Sep. 28, 2019', and '12 Months Ended' on its own
+PERIOD_RE = re.compile(r'^\s*(?:(\d+)\s+Months?\s+Ended\s*)?([A-Za-z]{3})[a-z]*\.?\s+(\d{1,2}),\s+(\d{4})\s*$', re.IGNORECASE)
+DURATION_RE = re.compile(r'(\d+)\s+Months?\s+Ended', re.IGNORECASE)
+MONTHS = dict((name, n + 1) for n, name in enumerate(['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep',
+                                                      'oct', 'nov', 'dec']))
+
+# the statements build_statements() builds, under the names grab_financial_statements() gives them in reportOrder
+STATEMENT_NAMES = ['Balance Sheet', 'Income Statement', 'Statement of Cash Flows', "Statement of Stockholders' Equity"]
+
+# one column of a statement: the date the period ends, and how many months long it is (None for a balance sheet
+# date, which is one day and not a period)
+Period = namedtuple('Period', ['end', 'months'])
+
+
+class StatementLayoutError(ValueError):
+    '''Raised when the header rows of a statement can't be lined up with its columns of numbers, so there is no
+    telling which column is which.'''
+
+
+def to_numbers(cells):
+    '''Turns a 2-d (or 1-d) list or array of statement cells into a float64 numpy array of the same shape, in one
+    vectorized pass: '$ 6,480' becomes 6480.0, '(4,704)' becomes -4704.0, '—' becomes 0.0, '$ 2.09 [1]'
+    becomes 2.09, '21.0%' becomes 21.0 (the number as it is shown), and '' or any text becomes NaN.'''
+    cells = np.asarray(cells, dtype = object)
+    if cells.size == 0:
+        return np.empty(cells.shape, dtype = np.float64)
+
+    series = pd.Series(cells.ravel(), dtype = object)
+    parts = series.str.extract(NUMBER_RE)
+
+    values = pd.to_numeric(parts['number'].str.replace(',', '', regex = False), errors = 'coerce')
+    values = values.to_numpy(dtype = np.float64, na_value = np.nan, copy = True)
+    negative = (parts['open'].notna() | parts['minus'].notna()).to_numpy()
+    values[negative] = -values[negative]
+    values[series.str.match(DASH_RE).to_numpy(dtype = object) == True] = 0.0
+    return values.reshape(cells.shape)
+
+def parse_statement_scale(title):
+    '''Reads the unit and scales out of the title cell of a statement file (see StatementScale). A scale that
+    doesn't say what it is for ('In Millions') is for the dollars and the shares, unless the title says
+    'except Share data'.'''
+    title = title or ''
+    unit = UNIT_RE.search(title)
+    money = shares = None
+    general = None
+    for which, scale in SCALE_RE.findall(title):
+        if which.lower() in ('shares', 'share data'):
+            shares = SCALES[scale.lower()]
+        elif which:
+            money = SCALES[scale.lower()]
+        elif general is None:
+            general = SCALES[scale.lower()]
+
+    money = money or general
+    if shares is None and not EXCEPT_SHARES_RE.search(title):
+        shares = general
+    return StatementScale(unit.group(1) if unit else None, money or 1.0, shares or 1.0)
+
+def row_scales(labels, scale):
+    '''The number each row of a statement has to be multiplied by: the share scale for the rows labelled
+    '(in shares)', 1 for the rows labelled '(in dollars per share)', and the money scale for everything else.'''
+    labels = pd.Series(labels, dtype = object).fillna('').astype(str)
+    factors = np.full(len(labels), scale.money, dtype = np.float64)
+    factors[labels.str.contains(SHARE_ROW_RE).to_numpy(dtype = bool)] = scale.shares
+    factors[labels.str.contains(PER_SHARE_RE).to_numpy(dtype = bool)] = 1.0
+    return factors
+
+def apply_scale(df, title):
+    '''Returns the (already cleaned) statement dataframe in plain dollars and shares, using the scale in the
+    title cell of the statement file. The StatementScale is kept in df.attrs['scale'].'''
+    scale = parse_statement_scale(title)
+    df = pd.DataFrame(df.to_numpy(dtype = np.float64) * row_scales(df.index, scale)[:, None],
+                      index = df.index, columns = df.columns)
+    df.attrs['scale'] = scale
+    return df
+
+def clean_statement_df(df):
+    '''Returns a copy of the statement dataframe with every cell turned into a float (see to_numbers()), with the
+    same index and columns.'''
+    return pd.DataFrame(to_numbers(df.to_numpy(dtype = object)), index = df.index, columns = df.columns)
+
+def _is_empty(cells):
+    '''True for every cell that is None, NaN, or only whitespace.'''
+    series = pd.Series(np.asarray(cells, dtype = object).ravel(), dtype = object)
+    empty = series.isna().to_numpy() | (series.astype(str).str.strip() == '').to_numpy()
+    return empty.reshape(np.shape(cells))
+
+def split_footnotes(df):
+    '''Takes the footnotes out of a statement dataframe (the raw cells, with the row labels as the index).
+    Returns the statement without the footnote rows at the bottom, without the markers in the row labels, and
+    without any column that only held markers, and a dictionary of footnote number to Footnote.'''
+    labels = pd.Series(df.index, dtype = object).fillna('').astype(str)
+    cells = df.to_numpy(dtype = object)
+    empty = _is_empty(cells)
+
+    # the footnote rows are the run of blank rows and '[n]...' rows at the very bottom of the table
+    noteRow = labels.str.match(FOOTNOTE_ROW_RE).to_numpy() | ((labels.str.strip() == '').to_numpy() & empty.all(axis = 1))
+    bodyRows = np.flatnonzero(~noteRow)
+    end = bodyRows[-1] + 1 if len(bodyRows) else 0
+
+    texts = {}
+    for row in range(end, len(labels)):
+        if not FOOTNOTE_ROW_RE.match(labels.iloc[row]):
+            continue
+        # the label and the cells after it ('[1]' on its own, with the text in the next cell) are split on every
+        # marker, so each footnote only gets the text up to the next one
+        row_text = '\n'.join([labels.iloc[row]] + [str(cell) for cell, isEmpty in zip(cells[row], empty[row]) if not isEmpty])
+        parts = FOOTNOTE_MARKER_RE.split(row_text)
+        for number, text in zip(parts[1::2], parts[2::2]):
+            if text.strip():
+                texts.setdefault(int(number), text.strip())
+
+    body = df.iloc[:end]
+    labels = labels.iloc[:end]
+    cells = cells[:end]
+    empty = empty[:end]
+
+    # one scan for every marker in the statement: the row labels in the first column, then the cells
+    scanned = np.column_stack([labels.to_numpy(dtype = object), cells]) if end else np.empty((0, cells.shape[1] + 1), object)
+    markers = pd.Series(scanned.ravel(), dtype = object).str.findall(FOOTNOTE_MARKER_RE)
+    found = np.flatnonzero(markers.str.len().fillna(0).to_numpy() > 0)
+
+    columns = [None] + list(body.columns)
+    positions = {}
+    for flat in found:
+        row, column = divmod(int(flat), scanned.shape[1])
+        for number in markers.iloc[flat]:
+            positions.setdefault(int(number), []).append((FOOTNOTE_MARKER_RE.sub('', labels.iloc[row]).strip(), columns[column]))
+
+    footnotes = {}
+    for number in sorted(set(texts) | set(positions)):
+        footnotes[number] = Footnote(number, texts.get(number), positions.get(number, []))
+    if not footnotes:
+        return body, footnotes
+
+    # take the markers out: off the row labels, out of the cells that are nothing but markers, and drop the
+    # columns that were only there to hold markers
+    markerOnly = pd.Series(cells.ravel(), dtype = object).str.match(MARKERS_ONLY_RE).to_numpy(dtype = object) == True
+    markerOnly = markerOnly.reshape(cells.shape)
+    cells = np.where(markerOnly, '', cells)
+    keep = ~((markerOnly | empty).all(axis = 0) & markerOnly.any(axis = 0))
+
+    body = pd.DataFrame(cells[:, keep], index = labels.str.replace(FOOTNOTE_MARKER_RE, '', regex = True).str.strip(),
+                        columns = body.columns[keep])
+    body.index.name = df.index.name
+    return body, footnotes
+
+@functools.lru_cache(maxsize = 1024)
+def parse_period_header(header, duration = None):
+    '''Turns one column header into a Period: 'Dec. 31, 2019' is Period(Timestamp('2019-12-31'), None), and
+    '12 Months Ended Sep. 28, 2019' (or 'Sep. 28, 2019' under a '12 Months Ended' duration header) is
+    Period(Timestamp('2019-09-28'), 12). Returns None if the header isn't a date.'''
+    match = PERIOD_RE.match(header or '')
+    if match is None or match.group(2).lower() not in MONTHS:
+        return None
+    months, month, day, year = match.groups()
+    if months is None and duration:
+        months = DURATION_RE.search(duration)
+        months = months.group(1) if months else None
+
+    try:
+        end = pd.Timestamp(int(year), MONTHS[month.lower()], int(day))
+    except ValueError:
+        return None
+    return Period(end, int(months) if months is not None else None)
+
+def period_index(periods, labels = None):
+    '''The columns for a list of Period's: a DatetimeIndex of the end dates (named 'Period End') when every end
+    date is different, which is how nearly every 10-K is laid out. A statement can also have the same end date
+    twice, like a '3 Months Ended' and a '12 Months Ended' column that both end Dec. 31, 2019, and then the
+    columns are a MultiIndex of (end date, months) named 'Period End' and 'Months', so each one is still its own
+    column. If even those repeat, the columns are the labels (the header text) instead.'''
+    ends = [period.end for period in periods]
+    if len(set(ends)) == len(ends):
+        return pd.DatetimeIndex(ends, name = 'Period End')
+    keys = [(period.end, period.months) for period in periods]
+    if len(set(keys)) == len(keys):
+        return pd.MultiIndex.from_tuples(keys, names = ['Period End', 'Months'])
+    return list(labels) if labels is not None else list(range(len(periods)))
+
+def period_columns(headers, durations = None):
+    '''Turns the column headers of a statement into its columns (see period_index()) and the list of Period's.
+    durations is the header row above the dates ('12 Months Ended'), if there is one. Without the spans of its
+    cells it can only be matched up with the dates if it has one cell for all of them or one for each of them,
+    otherwise the lengths are left out. If a header isn't a date at all, the headers are returned as they are
+    (and no Period's), so the statement still gets its columns.'''
+    durations = [duration for duration in (durations or []) if duration and DURATION_RE.search(duration)]
+    if len(durations) != len(headers):
+        durations = [durations[0] if len(durations) == 1 else None] * len(headers)
+
+    periods = [parse_period_header(header, duration) for header, duration in zip(headers, durations)]
+    if not periods or None in periods:
+        return list(headers), None
+    return period_index(periods, headers), periods
+
+def split_headers(headers):
+    '''Splits the header rows of a statement file into its title, its column headers, and the duration headers
+    ('12 Months Ended') over them, if there are any. The title is the first cell of the first row. With two
+    header rows the columns are the second row, otherwise they are the rest of the first row (like the balance
+    sheet and most statements of stockholders' equity).'''
+    title = headers[0][0] if headers and headers[0] else ''
+    if len(headers) > 1:
+        return title, list(headers[-1]), list(headers[0][1:])
+    return title, list(headers[0][1:]) if headers else [], None
+
+def header_stacks(headers, spans = None):
+    '''For every column of a statement (after the row labels), the header texts over it from the top row down.
+    spans is the (colspan, rowspan) of every header cell (statement_data['headerSpans'] from SECparse.py), and
+    the header rows are laid out with them the way a browser lays out the table, so a '12 Months Ended' over
+    three dates is over each of them, and in a statement of stockholders' equity 'Total' (which spans both
+    rows) is one column while 'Common Stock' is over both 'Shares' and 'Amount'. Without the spans, the columns
+    are guessed from split_headers(), and a duration row is only used if it lines up with the dates.'''
+    if not headers:
+        return []
+    if not spans or len(spans) != len(headers) or any(len(rowSpans) != len(row) for row, rowSpans in zip(headers, spans)):
+        title, columns, durations = split_headers(headers)
+        durations = [duration for duration in (durations or []) if DURATION_RE.search(duration)]
+        if len(durations) == 1:
+            durations = durations * len(columns)
+        if durations and len(durations) == len(columns):
+            return [[duration, column] for duration, column in zip(durations, columns)]
+        return [[column] for column in columns]
+
+    # every slot of the grid gets the (row, cell) of the header cell that covers it
+    width = sum(colspan for colspan, rowspan in spans[0])
+    grid = [[None] * width for row in headers]
+    for r, rowSpans in enumerate(spans):
+        c = 0
+        for n, (colspan, rowspan) in enumerate(rowSpans):
+            while c < width and grid[r][c] is not None:
+                c += 1
+            for down in range(r, min(r + rowspan, len(headers))):
+                for across in range(c, min(c + colspan, width)):
+                    grid[down][across] = (r, n)
+            c += colspan
+
+    stacks = []
+    for c in range(1, width):
+        cells = []
+        for r in range(len(headers)):
+            if grid[r][c] is not None and grid[r][c] not in cells:
+                cells.append(grid[r][c])
+        stacks.append([headers[r][n] for r, n in cells])
+    return stacks
+
+def label_positions(footnotes, labels):
+    '''Swaps the raw dataframe columns in the positions of the footnotes for the statement's column headers. labels
+    is a dictionary of raw column to header for the columns the statement kept. A marker in a column that was
+    dropped (one that only held markers) belongs to the value to its left.'''
+    def label(column):
+        if column is None:
+            return None
+        if column not in labels:
+            kept = [kept for kept in labels if kept < column]
+            if not kept:
+                return None
+            column = max(kept)
+        return labels[column]
+
+    return {number: footnote._replace(positions = [(row, label(column)) for row, column in footnote.positions])
+            for number, footnote in footnotes.items()}
+
+def statement_columns(stacks, width):
+    '''The column labels of a statement with width columns, from the header_stacks() over them. When the bottom
+    header of every column is a date, the columns are the periods (see period_index()), with the lengths from
+    the '12 Months Ended' headers over them. Otherwise each label is the headers of its column joined by ' - '
+    ('Common Stock - Shares'). Returns the labels and the Period's (None unless the labels are dates). Raises a
+    StatementLayoutError if the headers don't have one column for every column of numbers.'''
+    if len(stacks) != width:
+        raise StatementLayoutError('the header rows have ' + str(len(stacks)) + ' columns, but the statement has ' +
+                                   str(width) + ' columns of numbers')
+    labels = [' - '.join(stack) for stack in stacks]
+    periods = [parse_period_header(stack[-1], ' '.join(stack[:-1]) or None) if stack else None for stack in stacks]
+    if not periods or None in periods:
+        return labels, None
+    return period_index(periods, labels), periods
+
+def raw_statement_df(statement_data):
+    '''Puts the rows of one statement (from statements_data) into a dataframe of the raw cells, with the row labels
+    (the first cell of every row) as the index, named 'Category'.'''
+    df = pd.DataFrame(statement_data['data'])
+    if df.empty:
+        return pd.DataFrame(index = pd.Index([], name = 'Category'))
+    df = df.set_index(0)
+    df.index.name = 'Category'
+    return df
+
+def build_statements(statements_data, reportOrder, names = STATEMENT_NAMES):
+    '''Builds the dataframe of every statement in names that reportOrder has, in one pass. Returns a dictionary of
+    statement name to its dataframe (in plain dollars, with the period end dates as columns where the headers are
+    dates) and a dictionary of statement name to its footnotes (see split_footnotes()). statements_data isn't
+    changed. Raises a StatementLayoutError if the headers of a statement don't line up with its columns.'''
+    names = [name for name in names if name in reportOrder]
+
+    raw = {}
+    footnoteDict = {}
+    for name in names:
+        raw[name], footnoteDict[name] = split_footnotes(raw_statement_df(statements_data[reportOrder[name]]))
+
+    # convert the cells of every statement at once, then cut the values back up into the statements
+    values = to_numbers(np.concatenate([raw[name].to_numpy(dtype = object).ravel() for name in names])) if names else None
+    statement_dfs = {}
+    start = 0
+    for name in names:
+        df = raw[name]
+        statement_data = statements_data[reportOrder[name]]
+        title = split_headers(statement_data['headers'])[0]
+        stacks = header_stacks(statement_data['headers'], statement_data.get('headerSpans'))
+        end = start + df.size
+        df = pd.DataFrame(values[start:end].reshape(df.shape), index = df.index, columns = df.columns)
+        start = end
+
+        df = apply_scale(df, title)
+
+        # columns with nothing in them (like the one a footnote marker sat in) don't have a header
+        if df.shape[1] != len(stacks):
+            df = df.dropna(axis = 'columns', how = 'all')
+        columns, periods = statement_columns(stacks, df.shape[1])
+        footnoteDict[name] = label_positions(footnoteDict[name], dict(zip(df.columns, columns)))
+        df.columns = columns
+        if periods is not None:
+            df.attrs['periods'] = periods
+        statement_dfs[name] = df
+
+    return statement_dfs, footnoteDict
@@ -0,0 +1,144 @@
+'''
+Author: Marshall Jones
+Filename: SECtickers
+
+Description:
+getCIK used to download a whole browse-edgar search page and run a regex over it just to turn one ticker
+into a CIK. SEC publishes every ticker and CIK in one file, company_tickers.json, so the TickerIndex
+downloads that file once, keeps it in a dictionary in memory, and saves it to disk as a small tab separated
+file (one "TICKER<tab>CIK" line per company). After that, looking up a ticker doesn't need the network at all.
+
+The saved file is refreshed from SEC once it is older than maxAge (a day by default). If SEC can't be reached,
+the old file is used rather than failing. The source can also be a local copy of company_tickers.json.
+'''
+# import libraries
+import json
+import os
+import time
+from SECcache import CACHE_DIR, _atomicWrite
+
+TICKERS_URL = 'https://www.sec.gov/files/company_tickers.json'
+
+# where the compact index is saved
+INDEX_PATH = os.path.join(CACHE_DIR, 'company_tickers.tsv')
+
+# refresh the index once a day
+REFRESH_AGE = 24 * 60 * 60
+
+
+def normalizeTicker(ticker):
+    '''SEC writes share classes with a dash (BRK-B), but people usually type them with a dot (BRK.B).'''
+    return str(ticker).strip().upper().replace('.', '-')
+
+
+class TickerIndex(object):
+
+    def __init__(self, path = INDEX_PATH, maxAge = REFRESH_AGE, source = TICKERS_URL, client = None):
+        '''path is where the compact index is saved. source is either the url of company_tickers.json or the
+        path of a local copy of it. client is the EdgarClient used to download it (the shared one by default).'''
+        self.path = path
+        self.maxAge = maxAge
+        self.source = source
+        self.client = client
+        self.ciks = {}
+        self.loadedAt = None
+
+    def load(self):
+        '''Loads the saved index, refreshing it first if it is missing or too old.'''
+        if os.path.exists(self.path) and time.time() - os.path.getmtime(self.path) < self.maxAge:
+            self._read()
+            return self
+
+        try:
+            self.refresh()
+        except Exception as e:
+            if not os.path.exists(self.path):
+                raise
+            print("Couldn't refresh the ticker index (" + str(e) + "). Using the saved copy.")
+            self._read()
+        return self
+
+    def refresh(self):
+        '''Rebuilds the index from company_tickers.json and saves it.'''
+        if os.path.exists(self.source):
+            with open(self.source, 'rb') as f:
+                content = json.load(f)
+        else:
+            # imported here so the index can be built from a local file without the client
+            from SECclient import getClient
+            client = self.client or getClient()
+            response = client.get(self.source)
+            response.raise_for_status()
+            content = response.json()
+
+        # company_tickers.json looks like {"0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."}, ...}
+        ciks = {}
+        for company in content.values():
+            ciks.setdefault(normalizeTicker(company['ticker']), str(company['cik_str']))
+
+        lines = [ticker + '\t' + cik for ticker, cik in sorted(ciks.items())]
+        _atomicWrite(self.path, ('\n'.join(lines) + '\n').encode('utf-8'))
+        self.ciks = ciks
+        self.loadedAt = time.time()
+        return self
+
+    def _read(self):
+        ciks = {}
+        with open(self.path, 'r') as f:
+            for line in f:
+                ticker, cik = line.rstrip('\n').split('\t')
+                ciks[ticker] = cik
+        self.ciks = ciks
+        self.loadedAt = time.time()
+
+    def lookup(self, ticker):
+        '''Returns the CIK of the ticker (without the leading zeros, like getCIK), or raises a KeyError if SEC
+        doesn't list the ticker. Reloads the index first if it has been in memory longer than maxAge.'''
+        if self.loadedAt is None or time.time() - self.loadedAt >= self.maxAge:
+            self.load()
+        return self.ciks[normalizeTicker(ticker)]
+
+    def __contains__(self, ticker):
+        try:
+            self.lookup(ticker)
+            return True
+        except KeyError:
+            return False
+
+    def __len__(self):
+        return len(self.ciks)
+
+
+# the index shared by every function that isn't handed one explicitly
+_defaultIndex = None
+
+def getTickerIndex():
+    '''Returns the shared TickerIndex, loading it the first time it is needed.'''
+    global _defaultIndex
+    if _defaultIndex is None:
+        _defaultIndex = TickerIndex().load()
+    return _defaultIndex
+
+def findCIK(ticker, index = None):
+    '''Returns the CIK of the ticker from the index, or None if the ticker isn't listed or the index can't be
+    loaded at all (no saved copy and SEC can't be reached), so the caller can fall back to the search page.'''
+    try:
+        if index is None:
+            index = getTickerIndex()
+        return index.lookup(ticker)
+    except KeyError:
+        return None
+    except Exception as e:
+        print("Couldn't load the ticker index (" + str(e) + ").")
+        return None
+
+def getCIKs(TICKERS, index = None):
+    '''Batch version of getCIK: returns a dictionary of ticker to CIK for every ticker SEC lists, for example
+    {'WMT': '104169', 'AMZN': '1018724', 'NFLX': '1065280'}. Tickers that aren't listed are left out.'''
+    if index is None:
+        index = getTickerIndex()
+    cik_dict = {}
+    for ticker in TICKERS:
+        if ticker in index:
+            cik_dict[str(ticker).upper()] = index.lookup(ticker)
+    return cik_dict
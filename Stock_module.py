@@ -12,21 +12,30 @@ import re, requests
 import pandas as pd
 import numpy as np
 from bs4 import BeautifulSoup
+from SECclient import getClient
+from SECtickers import findCIK
 
 class Company(object):
 
-    def __init__(self):
-        self.CIK = get_CIK(ticker)
+    def __init__(self, client = None):
+        '''Every request the company makes to SEC Edgar goes through the same pooled client (see SECclient.py).
+        If no client is given, the shared one is used.'''
+        self.client = client or getClient()
     
 
     def get_CIK(self, ticker):
-        '''This method uses requests to go to the URL address, and then uses the input ticker to find the
+        '''This method looks the ticker up in the local ticker index (see SECtickers.py). If the ticker isn't
+        there, it uses requests to go to the URL address, and then uses the input ticker to find the
         CIK of that company. It creates a list of CIK's in the variable 'results' but the elements are all the
         same.'''
+        CIK = findCIK(ticker)
+        if CIK is not None:
+            return CIK
+
         URL = 'https://www.sec.gov/cgi-bin/browse-edgar?CIK={}&Find=Search&owner=exclude&action=getcompany'
         CIK_RE = re.compile(r'.*CIK=(\d{10}).*')
         cik_dict = {}
-        f = requests.get(URL.format(ticker), stream = True)
+        f = self.client.get(URL.format(ticker), stream = True)
         results = CIK_RE.findall(f.text)
         
         if len(results):
@@ -37,7 +46,7 @@ class Company(object):
         return CIK
     
 
-    def get_filingList(self, self.CIK, docType):
+    def get_filingList(self, CIK, docType):
         '''This function is an intermediary between finding the company CIK and pulling the 10-K document.
         It is called in the first line of get10kFilingInfo, not in the main function.
         
@@ -61,7 +70,7 @@ class Company(object):
         }
 
         # make the request
-        response = requests.get(url=browse_edgar, params=search_params)
+        response = self.client.get(url=browse_edgar, params=search_params)
         filingListSoup = BeautifulSoup(response.content,'xml')
         #print("Response URL:\n"+response.url)
         
@@ -189,7 +198,7 @@ class Company(object):
         DocLandPage_url = normal_url.replace('-','').replace('.txt','/index.json')
 
         # request the url and decode it.
-        content = requests.get(DocLandPage_url).json()
+        content = self.client.get(DocLandPage_url).json()
         #print(content)
 
         if counter > 0:
@@ -242,7 +251,7 @@ class Company(object):
         filingFolderURL = xml_summary.replace('FilingSummary.xml', '')
 
         # request and parse the content
-        content = requests.get(xml_summary).content
+        content = self.client.get(xml_summary).content
         soup = BeautifulSoup(content, 'lxml')
 
         # find the 'myreports' tag because this contains all the individual reports submitted.
@@ -445,7 +454,7 @@ class Company(object):
             dataRows = 0
             
             # request the statement file content
-            content = requests.get(statement).content
+            content = self.client.get(statement).content
             report_soup = BeautifulSoup(content, 'html')
 
             # find all the rows, figure out what type of row it is, parse the elements, and store in the statement file list.
@@ -0,0 +1,17 @@
+'''
+Author: Marshall Jones
+Filename: conftest
+
+Description:
+Lets the tests import the modules in the top folder of the repository (SECstatements, SECfacts, etc.), and
+points them at the fixture corpus.
+'''
+# import libraries
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'fixtures')
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
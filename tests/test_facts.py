@@ -0,0 +1,33 @@
+'''
+Author: Marshall Jones
+Filename: test_facts
+
+Description:
+Tests for SECfacts.py, using a companyfacts json file from the fixtures folder.
+'''
+# import libraries
+import json
+import os
+import pandas as pd
+from SECfacts import getCompanyFacts
+from conftest import FIXTURES
+
+# Coca-Cola's facts, which (like the real ones) have no Liabilities concept
+FACTS = os.path.join(FIXTURES, 'companyfacts')
+
+
+def test_fixture_has_no_liabilities_concept():
+    with open(os.path.join(FACTS, 'CIK0000021344.json')) as f:
+        concepts = json.load(f)['facts']['us-gaap']
+    assert 'Liabilities' not in concepts
+
+def test_balance_sheet_has_total_liabilities_and_equity():
+    balSheet_df, income_df, cashFlow_df = getCompanyFacts(21344, source = FACTS).statements()
+    assert 'Total liabilities' not in balSheet_df.index
+    totals = balSheet_df.loc['Total liabilities and equity']
+    assert totals[pd.Timestamp('2019-12-31')] == balSheet_df.loc['Total assets', pd.Timestamp('2019-12-31')]
+
+def test_total_liabilities_work_out_from_the_totals():
+    balSheet_df, income_df, cashFlow_df = getCompanyFacts(21344, source = FACTS).statements()
+    liabilities = balSheet_df.loc['Total liabilities and equity'] - balSheet_df.loc['Total equity']
+    assert liabilities.notna().all() and (liabilities > 0).all()
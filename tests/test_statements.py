@@ -0,0 +1,104 @@
+'''
+Author: Marshall Jones
+Filename: test_statements
+
+Description:
+Tests for SECstatements.py, using row labels and statement files the way Edgar's renderer writes them.
+'''
+# import libraries
+import os
+import pandas as pd
+import pytest
+import SECparse
+from SECstatements import StatementLayoutError, StatementScale, build_statements, row_scales
+from conftest import FIXTURES
+
+MILLIONS = StatementScale('USD', 1e6, 1e6)
+
+
+def load_statement(filing, fileName):
+    with open(os.path.join(FIXTURES, filing, fileName), 'rb') as f:
+        return SECparse.parse_statement(f.read())[0]
+
+def build_one(filing, fileName):
+    statement_dfs, footnoteDict = build_statements({0: load_statement(filing, fileName)}, {'Statement': 0}, ['Statement'])
+    return statement_dfs['Statement']
+
+
+@pytest.mark.parametrize('label', [
+    'Common stock and additional paid-in capital, $0.00001 par value: 50,400,000 shares authorized; 4,443,236 and '
+    '4,754,986 shares issued and outstanding, respectively',
+    'Preferred stock, no par value, 5,000 shares authorized',
+    'Cash dividends declared ($2.12 per share)',
+    'Dividends (per share - $1.60, $1.56 and $1.48 in 2019, 2018 and 2017, respectively)',
+    'Weighted-average shares outstanding',
+])
+def test_money_rows_that_mention_shares_use_the_money_scale(label):
+    assert row_scales([label], StatementScale('USD', 1e6, 1e3))[0] == 1e6
+
+@pytest.mark.parametrize('label, factor', [
+    ('Diluted (in shares)', 1e3),
+    ('Weighted-average common shares outstanding, basic (in shares)', 1e3),
+    ('Balances (in shares) at Jan. 31, 2019', 1e3),
+    ('Basic (in dollars per share)', 1.0),
+    ('Basic net income per common share attributable to Walmart (in dollars per share)', 1.0),
+    ('Earnings per share, basic (in USD per share)', 1.0),
+])
+def test_unit_suffixes_pick_the_row_scale(label, factor):
+    assert row_scales([label], StatementScale('USD', 1e6, 1e3))[0] == factor
+
+def test_balance_sheet_equity_lines_are_in_dollars():
+    balSheet_df = build_one('0000320193-19-000119', 'R4.htm')
+    commonStock = [label for label in balSheet_df.index if label.startswith('Common stock')][0]
+    assert balSheet_df.loc[commonStock].iloc[0] == 45174e6
+
+def test_equity_statement_scales_dividends_and_shares():
+    equity_df = build_one('0000104169-20-000011', 'R5.htm')
+    assert equity_df.loc['Cash dividends declared ($2.12 per share)'].iloc[0] == -6048e6
+    assert equity_df.loc['Balances (in shares) at Jan. 31, 2020', 'Common Stock - Shares'] == 2832e6
+
+def test_income_statement_per_share_and_share_counts():
+    income_df = build_one('0000320193-19-000119', 'R2.htm')
+    assert income_df.loc['Basic (in dollars per share)'].iloc[0] == 11.97
+    assert income_df.loc['Basic (in shares)'].iloc[0] == 4617834e3
+    assert income_df.loc['Net income'].iloc[0] == 55256e6
+
+MIXED_DURATIONS = b'''<table>
+<tr><th class="tl" colspan="1" rowspan="2">Consolidated Statements of Income - USD ($) $ in Millions</th>
+<th class="th" colspan="2" rowspan="1">3 Months Ended</th><th class="th" colspan="2" rowspan="1">12 Months Ended</th></tr>
+<tr><th class="th">Dec. 31, 2019</th><th class="th">Dec. 31, 2018</th><th class="th">Dec. 31, 2019</th><th class="th">Dec. 31, 2018</th></tr>
+<tr class="re"><td class="pl">Revenues</td><td class="nump">$ 10</td><td class="nump">$ 9</td><td class="nump">$ 40</td><td class="nump">$ 36</td></tr>
+</table>'''
+
+@pytest.mark.parametrize('parser', sorted(SECparse.STATEMENT_PARSERS))
+def test_quarter_and_year_ending_the_same_day_are_separate_columns(parser):
+    statement_data = SECparse.parse_statement(MIXED_DURATIONS, parser)[0]
+    statement_dfs, footnoteDict = build_statements({0: statement_data}, {'Income Statement': 0}, ['Income Statement'])
+    income_df = statement_dfs['Income Statement']
+    assert income_df.columns.is_unique
+    assert [period.months for period in income_df.attrs['periods']] == [3, 3, 12, 12]
+    assert income_df.loc['Revenues', (pd.Timestamp('2019-12-31'), 12)] == 40e6
+    assert income_df.loc['Revenues', (pd.Timestamp('2019-12-31'), 3)] == 10e6
+
+def test_annual_statement_keeps_date_columns():
+    income_df = build_one('0000320193-19-000119', 'R2.htm')
+    assert isinstance(income_df.columns, pd.DatetimeIndex)
+    assert [period.months for period in income_df.attrs['periods']] == [12, 12, 12]
+
+def test_equity_headers_line_up_with_their_columns():
+    equity_df = build_one('0000104169-20-000011', 'R5.htm')
+    assert list(equity_df.columns) == ['Total', 'Common Stock - Shares', 'Common Stock - Amount', 'Retained Earnings',
+                                       'Nonredeemable Noncontrolling Interest']
+    assert equity_df.loc['Balances (in shares) at Jan. 31, 2020', 'Common Stock - Shares'] == 2832e6
+
+MISSING_HEADER = b'''<table>
+<tr><th class="tl" colspan="1" rowspan="2">Consolidated Statements of Equity - USD ($) $ in Millions</th>
+<th class="th" colspan="1" rowspan="2">Total</th><th class="th" colspan="1" rowspan="2">Retained Earnings</th></tr>
+<tr></tr>
+<tr class="re"><td class="pl">Net income</td><td class="nump">$ 10</td><td class="nump">$ 9</td><td class="nump">$ 1</td></tr>
+</table>'''
+
+def test_headers_that_dont_line_up_raise_a_layout_error():
+    statement_data = SECparse.parse_statement(MISSING_HEADER)[0]
+    with pytest.raises(StatementLayoutError):
+        build_statements({0: statement_data}, {'Equity': 0}, ['Equity'])